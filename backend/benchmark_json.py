@@ -0,0 +1,84 @@
+import functools
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from server import DrugTest, Message, fast_json, model_projection
+
+# Compares the two ways a list endpoint can turn Mongo documents into a
+# response body:
+#   validated: response_model revalidation, then the stdlib JSON encoder
+#   fast:      documents handed straight to orjson (FAST_JSON_RESPONSES=true)
+# No database is needed; documents are shaped like what the list endpoints
+# read back with model_projection(), with BSON dates as naive UTC datetimes.
+#
+#   python benchmark_json.py [rows] [rounds]
+
+def drug_test_doc(i: int) -> dict:
+    when = datetime(2025, 1, 1) + timedelta(hours=i)
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": f"user_{i % 40}",
+        "test_date": when,
+        "test_type": "Urine",
+        "result": "Negative" if i % 7 else "Positive",
+        "administered_by": "mentor_1",
+        "notes": "Routine weekly test" if i % 3 else None,
+        "image_url": f"/uploads/sha256/ab/cd/{uuid.uuid4().hex}.jpg" if i % 2 else None,
+        "created_at": when + timedelta(seconds=1, microseconds=250000)
+    }
+
+def message_doc(i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "sender_id": f"user_{i % 40}",
+        "recipient_id": None if i % 5 else "user_1",
+        "content": "Reminder about tonight's house meeting. " * 4,
+        "mentioned_users": ["user_2"] if i % 4 == 0 else None,
+        "created_at": datetime(2025, 1, 1) + timedelta(minutes=i),
+        "read": bool(i % 2)
+    }
+
+@functools.lru_cache(maxsize=None)
+def list_adapter(model) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+def validated(model, docs: List[dict]) -> bytes:
+    adapter = list_adapter(model)
+    items = adapter.validate_python(docs)
+    return JSONResponse(adapter.dump_python(items, mode="json")).body
+
+def fast(model, docs: List[dict]) -> bytes:
+    return fast_json(docs, model)
+
+def timed(fn, model, docs, rounds: int) -> float:
+    fn(model, docs)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(model, docs)
+    return (time.perf_counter() - start) / rounds * 1000
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    print(f"{rows} rows, {rounds} rounds")
+    print(f"{'model':<12}{'validated ms':>14}{'fast ms':>10}{'speedup':>10}")
+    for model, make in [(DrugTest, drug_test_doc), (Message, message_doc)]:
+        fields = set(model_projection(model)) - {"_id"}
+        docs = [{k: v for k, v in make(i).items() if k in fields} for i in range(rows)]
+        slow_ms = timed(validated, model, docs, rounds)
+        fast_ms = timed(fast, model, docs, rounds)
+        print(f"{model.__name__:<12}{slow_ms:>14.2f}{fast_ms:>10.2f}{slow_ms / fast_ms:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+# Offline load test: starts server.py (and session_stub.py for logins)
+# against a local mongod or a throwaway in-memory one, seeds a realistic
+# house, drives concurrent mixed traffic and reports p50/p95/p99 latency and
+# requests per second per route.
+#
+#   python load_test.py --mongo-url mongodb://localhost:27017
+#   python load_test.py --in-memory                  (needs pymongo_inmemory)
+#   python load_test.py --save-baseline              (writes --baseline)
+#   python load_test.py --compare                    (exit 1 on regressions)
+#
+# No baseline is committed: numbers only compare on the host that recorded
+# them, so --compare refuses to start until --save-baseline has been run.
+# Seeded data goes into its own database, dropped afterwards unless
+# --keep-data is given. Uploads go to a temporary directory.
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+import httpx
+from PIL import Image
+from pymongo import MongoClient
+
+ROOT_DIR = Path(__file__).parent
+DEFAULT_BASELINE = ROOT_DIR.parent / 'test_reports' / 'load_baseline.json'
+SEED_CHUNK = 1000
+
+# (route, weight): the mix a busy evening looks like, mostly residents
+# checking messages and their dashboard
+SCENARIOS = [
+    ("GET /api/messages", 35),
+    ("GET /api/dashboard/{user_id}", 25),
+    ("GET /api/drug-tests", 10),
+    ("POST /api/messages", 10),
+    ("POST /api/auth/session", 10),
+    ("POST /api/upload", 5),
+    ("GET /api/calendar-events", 5),
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test server.py with mixed traffic")
+    parser.add_argument("--mongo-url", default=os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    parser.add_argument("--in-memory", action="store_true", help="start a throwaway mongod with pymongo_inmemory")
+    parser.add_argument("--residents", type=int, default=200)
+    parser.add_argument("--mentors", type=int, default=10)
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds before measuring")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--stub-port", type=int, default=8766)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95/RPS drift when comparing")
+    parser.add_argument("--seed", type=int, default=117)
+    parser.add_argument("--keep-data", action="store_true")
+    return parser.parse_args()
+
+# Seeding
+def _insert(collection, docs):
+    for start in range(0, len(docs), SEED_CHUNK):
+        collection.insert_many(docs[start:start + SEED_CHUNK], ordered=False)
+
+def seed(db, args, rng: random.Random) -> dict:
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(days=args.history_days)
+
+    def user(role: str, index: int) -> dict:
+        user_id = f"load-{role}-{index}"
+        return {
+            "id": user_id,
+            "email": f"{user_id}@example.com",
+            "name": f"{role.title()} {index}",
+            "picture": "",
+            "role": role,
+            "created_at": start
+        }
+    residents = [user("user", i) for i in range(args.residents)]
+    mentors = [user("mentor", i) for i in range(args.mentors)]
+    admin = user("admin", 0)
+    users = residents + mentors + [admin]
+    _insert(db.users, users)
+    _insert(db.user_sessions, [
+        {"user_id": u["id"], "session_token": f"tok-{u['id']}", "expires_at": now + timedelta(days=1), "created_at": now}
+        for u in users
+    ])
+
+    tests, meetings, payments = [], [], []
+    for resident in residents:
+        for week in range(args.history_days // 7):
+            when = start + timedelta(days=week * 7, hours=rng.randint(8, 20))
+            tests.append({
+                "id": str(uuid.uuid4()),
+                "user_id": resident["id"],
+                "test_date": when,
+                "test_type": rng.choice(["urinalysis", "breathalyzer"]),
+                "result": "negative" if rng.random() > 0.05 else "positive",
+                "administered_by": rng.choice(mentors)["id"],
+                "notes": None,
+                "image_url": None,
+                "created_at": when
+            })
+            for day in rng.sample(range(7), 3):
+                when = start + timedelta(days=week * 7 + day, hours=19)
+                meetings.append({
+                    "id": str(uuid.uuid4()),
+                    "user_id": resident["id"],
+                    "meeting_date": when,
+                    "meeting_type": rng.choice(["AA", "NA", "House"]),
+                    "attended": rng.random() > 0.1,
+                    "notes": None,
+                    "recorded_by": rng.choice(mentors)["id"],
+                    "created_at": when
+                })
+        for month in range(args.history_days // 30):
+            when = start + timedelta(days=month * 30 + 1)
+            payments.append({
+                "id": str(uuid.uuid4()),
+                "user_id": resident["id"],
+                "payment_date": when,
+                "amount": 400.0,
+                "confirmed": rng.random() > 0.2,
+                "confirmed_by": None,
+                "confirmation_date": None,
+                "notes": None,
+                "image_url": None,
+                "created_at": when
+            })
+    _insert(db.drug_tests, tests)
+    _insert(db.meetings, meetings)
+    _insert(db.rent_payments, payments)
+
+    messages = []
+    for i in range(args.messages):
+        sender = rng.choice(users)
+        when = start + timedelta(seconds=rng.randint(0, args.history_days * 86400))
+        messages.append({
+            "id": str(uuid.uuid4()),
+            "sender_id": sender["id"],
+            "recipient_id": None if rng.random() < 0.3 else rng.choice(users)["id"],
+            "content": f"Load test message {i}",
+            "mentioned_users": None,
+            "created_at": when,
+            "read": rng.random() > 0.5
+        })
+    _insert(db.messages, messages)
+    _insert(db.devotions, [
+        {"id": str(uuid.uuid4()), "title": f"Devotion {i}", "content": "Today's reading. " * 40,
+         "scripture_reference": None, "external_links": None, "author_id": admin["id"],
+         "created_at": start + timedelta(days=i)}
+        for i in range(args.history_days)
+    ])
+    _insert(db.calendar_events, [
+        {"id": str(uuid.uuid4()), "title": f"House meeting {i}", "description": None,
+         "event_date": start + timedelta(days=i * 7, hours=19), "event_type": "Meeting",
+         "location": None, "leader": None, "is_recurring": False, "recurrence_pattern": None,
+         "rrule": None, "series_id": None, "created_by": admin["id"], "created_at": start}
+        for i in range(args.history_days // 7 + 8)
+    ])
+
+    return {
+        "residents": [u["id"] for u in residents],
+        "mentors": [u["id"] for u in mentors],
+        "counts": {
+            "users": len(users),
+            "drug_tests": len(tests),
+            "meetings": len(meetings),
+            "rent_payments": len(payments),
+            "messages": len(messages),
+        }
+    }
+
+# Processes
+def start_process(args_list, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", *args_list, "--log-level", "warning"],
+        cwd=ROOT_DIR, env={**os.environ, **env}
+    )
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Process for {url} exited with {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise SystemExit(f"{url} did not come up within {timeout:.0f}s")
+
+def sample_images(rng: random.Random, count: int = 16) -> list:
+    images = []
+    for _ in range(count):
+        color = tuple(rng.randrange(256) for _ in range(3))
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64), color).save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+    return images
+
+# Traffic
+async def run_scenario(client: httpx.AsyncClient, route: str, context: dict, rng: random.Random) -> httpx.Response:
+    resident = rng.choice(context["residents"])
+    auth = {"Authorization": f"Bearer tok-{resident}"}
+    if route == "GET /api/messages":
+        return await client.get("/api/messages", params={"limit": 50}, headers=auth)
+    if route == "GET /api/dashboard/{user_id}":
+        return await client.get(f"/api/dashboard/{resident}", headers=auth)
+    if route == "GET /api/drug-tests":
+        mentor = rng.choice(context["mentors"])
+        return await client.get("/api/drug-tests", params={"limit": 50}, headers={"Authorization": f"Bearer tok-{mentor}"})
+    if route == "POST /api/messages":
+        return await client.post("/api/messages", json={"content": "Checking in"}, headers=auth)
+    if route == "POST /api/auth/session":
+        return await client.post("/api/auth/session", headers={"X-Session-ID": f"load-{rng.randrange(500)}"})
+    if route == "POST /api/upload":
+        image = rng.choice(context["images"])
+        return await client.post("/api/upload", files={"file": ("proof.png", image, "image/png")}, headers=auth)
+    if route == "GET /api/calendar-events":
+        return await client.get("/api/calendar-events", params={"limit": 50}, headers=auth)
+    raise ValueError(route)
+
+async def drive(base_url: str, context: dict, args) -> tuple:
+    routes = [route for route, _ in SCENARIOS]
+    weights = [weight for _, weight in SCENARIOS]
+    samples = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+    loop_start = time.monotonic()
+    measure_from = loop_start + args.warmup
+    stop_at = measure_from + args.duration
+
+    async def worker(index: int):
+        rng = random.Random(args.seed + index)
+        while time.monotonic() < stop_at:
+            route = rng.choices(routes, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await run_scenario(client, route, context, rng)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            elapsed = time.perf_counter() - started
+            if time.monotonic() >= measure_from:
+                samples[route].append(elapsed)
+                if not ok:
+                    errors[route] += 1
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    return samples, errors
+
+# Reporting
+def percentile(sorted_values: list, fraction: float) -> float:
+    # Nearest rank
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(samples: dict, errors: dict, duration: float) -> dict:
+    routes = {}
+    for route, values in samples.items():
+        values = sorted(values)
+        routes[route] = {
+            "count": len(values),
+            "errors": errors[route],
+            "rps": len(values) / duration,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+        }
+    total = sum(len(values) for values in samples.values())
+    return {"total_rps": total / duration, "routes": routes}
+
+def print_report(summary: dict):
+    print(f"{'route':<34}{'count':>8}{'errors':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, row in summary["routes"].items():
+        print(f"{route:<34}{row['count']:>8}{row['errors']:>8}{row['rps']:>9.1f}"
+              f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}")
+    print(f"total {summary['total_rps']:.1f} req/s")
+
+def compare(summary: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for route, base in baseline["routes"].items():
+        current = summary["routes"].get(route)
+        if not current or not base["count"]:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {base['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms")
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{route}: rps {base['rps']:.1f} -> {current['rps']:.1f}")
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{route}: errors {base['errors']} -> {current['errors']}")
+    return regressions
+
+def load_baseline(path: Path) -> dict:
+    # Checked before seeding, so a missing or unreadable baseline fails in a
+    # second rather than after the whole run
+    if not path.exists():
+        raise SystemExit(f"No baseline at {path}; record one on this host with --save-baseline first")
+    try:
+        baseline = json.loads(path.read_text())
+    except ValueError as e:
+        raise SystemExit(f"Baseline {path} is not valid JSON: {e}")
+    if not isinstance(baseline, dict) or not isinstance(baseline.get("routes"), dict):
+        raise SystemExit(f"Baseline {path} has no per-route results; re-record it with --save-baseline")
+    return baseline
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    baseline = load_baseline(args.baseline) if args.compare else None
+
+    mongod = None
+    mongo_url = args.mongo_url
+    if args.in_memory:
+        try:
+            from pymongo_inmemory import Mongod
+            from pymongo_inmemory.context import Context
+        except ImportError:
+            raise SystemExit("--in-memory needs pymongo_inmemory: pip install pymongo_inmemory")
+        mongod = Mongod(Context())
+        mongod.start()
+        mongo_url = mongod.connection_string
+
+    db_name = f"load_test_{int(time.time())}"
+    mongo = MongoClient(mongo_url)
+    processes = []
+    upload_dir = tempfile.TemporaryDirectory(prefix="load_test_uploads_")
+    try:
+        print(f"Seeding {db_name}...")
+        context = seed(mongo[db_name], args, rng)
+        context["images"] = sample_images(rng)
+        print(", ".join(f"{name}: {count}" for name, count in context["counts"].items()))
+
+        stub_url = f"http://127.0.0.1:{args.stub_port}"
+        base_url = f"http://127.0.0.1:{args.port}"
+        processes.append(start_process(["session_stub:app", "--port", str(args.stub_port)], {}))
+        processes.append(start_process(
+            ["server:app", "--port", str(args.port), "--workers", str(args.workers)],
+            {
+                "MONGO_URL": mongo_url,
+                "DB_NAME": db_name,
+                "SESSION_DATA_URL": f"{stub_url}/auth/v1/env/oauth/session-data",
+                "UPLOAD_DIR": upload_dir.name,
+                "DATETIME_MIGRATION_ON_STARTUP": "false",
+            }
+        ))
+        wait_until_up(f"{stub_url}/docs", processes[0])
+        wait_until_up(f"{base_url}/api/auth/me", processes[1])
+
+        print(f"Driving {args.concurrency} clients for {args.warmup:.0f}s warmup + {args.duration:.0f}s...")
+        samples, errors = asyncio.run(drive(base_url, context, args))
+        summary = summarize(samples, errors, args.duration)
+        print_report(summary)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+        if not args.keep_data:
+            mongo.drop_database(db_name)
+        mongo.close()
+        if mongod:
+            mongod.stop()
+        upload_dir.cleanup()
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "settings": {
+                "residents": args.residents,
+                "mentors": args.mentors,
+                "history_days": args.history_days,
+                "messages": args.messages,
+                "concurrency": args.concurrency,
+                "duration": args.duration,
+                "workers": args.workers,
+            },
+            **summary
+        }, indent=2) + "\n")
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.compare:
+        regressions = compare(summary, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Local stand-in for the Redis server used by SESSION_STORE=redis. Speaks
+# RESP and implements only the commands the session store sends: PING, AUTH,
+# SELECT, SET (with EX/PX), GET, DEL and PTTL. Keys expire like Redis keys.
+#
+#   python redis_stub.py --port 6399 [--requirepass secret]
+#   SESSION_STORE=redis SESSION_REDIS_URL=redis://127.0.0.1:6399/0 uvicorn server:app --workers 4
+import argparse
+import asyncio
+import time
+
+# key -> (value, expires_at monotonic or None)
+store: dict = {}
+# Checked by AUTH when set, like requirepass; unauthenticated commands are
+# not refused, since the session store always authenticates first
+password = None
+
+def encode(reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return f"-ERR {reply}\r\n".encode()
+    if isinstance(reply, int):
+        return f":{reply}\r\n".encode()
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return f"+{reply}\r\n".encode()
+
+def live(key: bytes):
+    entry = store.get(key)
+    if entry is None:
+        return None
+    value, expires_at = entry
+    if expires_at is not None and expires_at <= time.monotonic():
+        del store[key]
+        return None
+    return entry
+
+def handle(args: list):
+    command = args[0].upper()
+    if command == b"PING":
+        return "PONG"
+    if command == b"AUTH":
+        if password is not None and args[-1].decode() != password:
+            return ValueError("invalid password")
+        return "OK"
+    if command == b"SELECT":
+        return "OK"
+    if command == b"SET":
+        expires_at = None
+        options = [arg.upper() for arg in args[3:]]
+        if b"PX" in options:
+            expires_at = time.monotonic() + int(args[3 + options.index(b"PX") + 1]) / 1000
+        elif b"EX" in options:
+            expires_at = time.monotonic() + int(args[3 + options.index(b"EX") + 1])
+        store[args[1]] = (args[2], expires_at)
+        return "OK"
+    if command == b"GET":
+        entry = live(args[1])
+        return entry[0] if entry else None
+    if command == b"DEL":
+        removed = 0
+        for key in args[1:]:
+            if live(key):
+                del store[key]
+                removed += 1
+        return removed
+    if command == b"PTTL":
+        entry = live(args[1])
+        if entry is None:
+            return -2
+        if entry[1] is None:
+            return -1
+        return int((entry[1] - time.monotonic()) * 1000)
+    return ValueError(f"unknown command '{command.decode()}'")
+
+async def read_command(reader) -> list:
+    line = await reader.readline()
+    if not line:
+        raise EOFError
+    if not line.startswith(b"*"):
+        # Inline command, as typed into redis-cli or telnet
+        return line.split()
+    args = []
+    for _ in range(int(line[1:-2])):
+        length = int((await reader.readline())[1:-2])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+async def serve_client(reader, writer):
+    try:
+        while True:
+            args = await read_command(reader)
+            if args:
+                writer.write(encode(handle(args)))
+                await writer.drain()
+    except (EOFError, asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6399)
+    parser.add_argument("--requirepass")
+    args = parser.parse_args()
+    global password
+    password = args.requirepass
+    server = await asyncio.start_server(serve_client, args.host, args.port)
+    print(f"redis stub listening on {args.host}:{args.port}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run(main())
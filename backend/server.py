@@ -1,38 +1,394 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Cookie, Response, Header, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Cookie, Response, Header, UploadFile, File, Form, Request
+from fastapi import Path as PathParam
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, TEXT, CursorType, ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import OperationFailure, CollectionInvalid, BulkWriteError
 import os
 import logging
+import asyncio
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, AfterValidator
+from typing import Annotated, List, Optional, get_args
+from collections import OrderedDict, deque
 import uuid
+import time
+import bisect
+import copy
+import functools
+import orjson
+import random
+import threading
+from contextvars import ContextVar
 from datetime import datetime, timezone, timedelta
-import requests
+from email.utils import format_datetime, parsedate_to_datetime
+from dateutil.rrule import rrulestr
+import httpx
 import base64
-from PIL import Image
+import hashlib
+import hmac
+import json
+import urllib.parse
+import csv
+import html
+import re
+from PIL import Image, ImageOps
+from concurrent.futures import ProcessPoolExecutor
 import io
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# Create uploads directory
-UPLOAD_DIR = ROOT_DIR / 'uploads'
+# Create uploads directory. Resolved once, since StaticFiles hands back
+# real paths and they are compared against it.
+UPLOAD_DIR = Path(os.environ.get('UPLOAD_DIR', ROOT_DIR / 'uploads')).resolve()
 UPLOAD_DIR.mkdir(exist_ok=True)
+DERIVATIVE_DIR = UPLOAD_DIR / 'derivatives'
+DERIVATIVE_DIR.mkdir(exist_ok=True)
+# In-progress uploads live next to UPLOAD_DIR, not inside the served tree;
+# the same filesystem keeps the final move a rename
+UPLOAD_TMP_DIR = Path(os.environ.get('UPLOAD_TMP_DIR', UPLOAD_DIR.parent / f"{UPLOAD_DIR.name}-incoming")).resolve()
+UPLOAD_TMP_DIR.mkdir(exist_ok=True)
+
+# Metrics: MetricsMiddleware records per-route latency, status counts and
+# in-flight requests; MongoCommandMetrics, registered on the driver, times
+# every Mongo command by collection and operation. Both are rendered in
+# Prometheus text format at /metrics.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMMAND_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class RequestContext:
+    __slots__ = ("scope", "mongo_commands")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.mongo_commands = 0
+
+# Set per request by MetricsMiddleware. Motor runs driver calls with a copy
+# of the caller's context, so the command listener sees the request too.
+current_request: ContextVar[Optional[RequestContext]] = ContextVar("current_request", default=None)
+
+def _route_label(scope) -> str:
+    # The route template once routing has run; mounts report their prefix
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return scope.get("root_path") or "unmatched"
+
+class RequestMetrics:
+    def __init__(self):
+        self.in_flight = 0
+        self.requests: dict = {}
+        self.latency: dict = {}
+        self.mongo_commands: dict = {}
+
+    def record(self, method: str, route: str, status: int, seconds: float, mongo_commands: int):
+        self.requests[(method, route, str(status))] = self.requests.get((method, route, str(status)), 0) + 1
+        key = (method, route)
+        if key not in self.latency:
+            self.latency[key] = Histogram(LATENCY_BUCKETS)
+            self.mongo_commands[key] = Histogram(COMMAND_COUNT_BUCKETS)
+        self.latency[key].observe(seconds)
+        self.mongo_commands[key].observe(mongo_commands)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    # Called from the driver's executor threads, hence the lock
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: dict = {}
+        self.durations: dict = {}
+        self.commands: dict = {}
+        self.failures: dict = {}
+
+    def started(self, event):
+        name = event.command_name
+        target = event.command.get("collection" if name == "getMore" else name)
+        collection = target if isinstance(target, str) else ""
+        context = current_request.get()
+        if context is not None:
+            context.mongo_commands += 1
+        route = _route_label(context.scope) if context is not None else "background"
+        with self._lock:
+            self._pending[event.request_id] = (route, collection, name)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            entry = self._pending.pop(event.request_id, None)
+            if entry is None:
+                return
+            route, collection, name = entry
+            key = (collection, name)
+            if key not in self.durations:
+                self.durations[key] = Histogram(LATENCY_BUCKETS)
+            self.durations[key].observe(event.duration_micros / 1e6)
+            self.commands[(route, collection, name)] = self.commands.get((route, collection, name), 0) + 1
+            if failed:
+                self.failures[key] = self.failures.get(key, 0) + 1
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        context = RequestContext(scope)
+        token = current_request.set(context)
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        request_metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_metrics.in_flight -= 1
+            current_request.reset(token)
+            request_metrics.record(
+                scope["method"], _route_label(scope), status,
+                time.perf_counter() - started, context.mongo_commands
+            )
+
+request_metrics = RequestMetrics()
+mongo_metrics = MongoCommandMetrics()
+
+def _prometheus_labels(labels: dict) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+def _prometheus_histogram(lines: List[str], name: str, label_names: tuple, histograms: dict):
+    for key, histogram in sorted(histograms.items()):
+        labels = dict(zip(label_names, key))
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_prometheus_labels({**labels, 'le': bound})} {cumulative}")
+        lines.append(f"{name}_sum{_prometheus_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_prometheus_labels(labels)} {histogram.count}")
+
+def render_metrics() -> str:
+    lines = []
+    
+    def family(name: str, kind: str, help_text: str):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+    
+    family("http_requests_in_flight", "gauge", "Requests currently being served")
+    lines.append(f"http_requests_in_flight {request_metrics.in_flight}")
+    family("http_requests_total", "counter", "Requests by method, route template and status")
+    for (method, route, status), count in sorted(request_metrics.requests.items()):
+        lines.append(f"http_requests_total{_prometheus_labels({'method': method, 'route': route, 'status': status})} {count}")
+    family("http_request_duration_seconds", "histogram", "Request latency by method and route template")
+    _prometheus_histogram(lines, "http_request_duration_seconds", ("method", "route"), request_metrics.latency)
+    family("http_request_mongo_commands", "histogram", "Mongo commands issued per request")
+    _prometheus_histogram(lines, "http_request_mongo_commands", ("method", "route"), request_metrics.mongo_commands)
+    
+    with mongo_metrics._lock:
+        durations = dict(mongo_metrics.durations)
+        commands = dict(mongo_metrics.commands)
+        failures = dict(mongo_metrics.failures)
+    family("mongo_command_duration_seconds", "histogram", "Mongo command latency by collection and command")
+    _prometheus_histogram(lines, "mongo_command_duration_seconds", ("collection", "command"), durations)
+    family("mongo_commands_total", "counter", "Mongo commands by issuing route, collection and command")
+    for (route, collection, name), count in sorted(commands.items()):
+        lines.append(f"mongo_commands_total{_prometheus_labels({'route': route, 'collection': collection, 'command': name})} {count}")
+    family("mongo_command_failures_total", "counter", "Failed Mongo commands by collection and command")
+    for (collection, name), count in sorted(failures.items()):
+        lines.append(f"mongo_command_failures_total{_prometheus_labels({'collection': collection, 'command': name})} {count}")
+    return "\n".join(lines) + "\n"
+
+# Slow-query log: commands slower than SLOW_QUERY_MS are logged with the
+# calling route and their filter shape (field names and operators, values
+# replaced by "?"). A sample of them, at most one per shape per cooldown,
+# is re-run as explain("executionStats") on the event loop so missing
+# indexes show up without attaching a profiler.
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+SLOW_QUERY_EXPLAIN_SAMPLE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE', '0.1'))
+SLOW_QUERY_EXPLAIN_COOLDOWN = float(os.environ.get('SLOW_QUERY_EXPLAIN_COOLDOWN', '300'))
+SLOW_QUERY_HISTORY = 200
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+SHAPE_FIELDS = ("filter", "query", "sort", "key", "pipeline")
+EXPLAIN_DROP_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction"}
+
+def query_shape(value):
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list) and any(isinstance(item, (dict, list)) for item in value):
+        return [query_shape(item) for item in value]
+    return "?"
+
+def command_shape(command: dict) -> dict:
+    shape = {key: query_shape(command[key]) for key in SHAPE_FIELDS if key in command}
+    for batch in ("updates", "deletes"):
+        if command.get(batch):
+            shape["q"] = query_shape(command[batch][0].get("q", {}))
+    return shape
+
+class SlowQueryLog(monitoring.CommandListener):
+    def __init__(self, threshold_ms: float, explain_sample: float, explain_cooldown: float):
+        self.threshold_ms = threshold_ms
+        self.explain_sample = explain_sample
+        self.explain_cooldown = explain_cooldown
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.entries: deque = deque(maxlen=SLOW_QUERY_HISTORY)
+        self._lock = threading.Lock()
+        self._pending: dict = {}
+        self._explained_at: dict = {}
+        self._tasks = set()
+
+    def started(self, event):
+        if event.command_name == "explain":
+            return
+        context = current_request.get()
+        route = _route_label(context.scope) if context is not None else "background"
+        with self._lock:
+            self._pending[event.request_id] = (route, event.database_name, event.command)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        with self._lock:
+            entry = self._pending.pop(event.request_id, None)
+        duration_ms = event.duration_micros / 1000
+        if entry is None or duration_ms < self.threshold_ms:
+            return
+        
+        route, database, command = entry
+        name = event.command_name
+        target = command.get("collection" if name == "getMore" else name)
+        shape = command_shape(command)
+        record = {
+            "at": datetime.now(timezone.utc),
+            "route": route,
+            "collection": target if isinstance(target, str) else "",
+            "command": name,
+            "duration_ms": round(duration_ms, 1),
+            "shape": shape,
+            "explain": None
+        }
+        self.entries.append(record)
+        logger.warning(
+            f"Slow query {record['duration_ms']} ms in {route}: "
+            f"{record['collection']}.{name} {json.dumps(shape, default=str)}"
+        )
+        if name in EXPLAINABLE_COMMANDS and self._should_explain(record):
+            explain_body = {
+                key: value for key, value in command.items()
+                if key not in EXPLAIN_DROP_FIELDS and not key.startswith("$")
+            }
+            self.loop.call_soon_threadsafe(self._schedule_explain, record, database, explain_body)
+
+    def _should_explain(self, record: dict) -> bool:
+        if self.loop is None or random.random() >= self.explain_sample:
+            return False
+        key = (record["collection"], record["command"], json.dumps(record["shape"], sort_keys=True, default=str))
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained_at.get(key, float("-inf")) < self.explain_cooldown:
+                return False
+            self._explained_at[key] = now
+        return True
+
+    def _schedule_explain(self, record: dict, database: str, explain_body: dict):
+        task = asyncio.ensure_future(self._explain(record, database, explain_body))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _explain(self, record: dict, database: str, explain_body: dict):
+        try:
+            result = await client[database].command({"explain": explain_body, "verbosity": "executionStats"})
+        except Exception as e:
+            record["explain"] = {"error": str(e)}
+            return
+        stats = result.get("executionStats", {})
+        stages = [stage for stage in _plan_stages(result.get("queryPlanner", {}).get("winningPlan", {})) if stage]
+        record["explain"] = {
+            "stages": stages,
+            "collection_scan": "COLLSCAN" in stages,
+            "execution_ms": stats.get("executionTimeMillis"),
+            "keys_examined": stats.get("totalKeysExamined"),
+            "docs_examined": stats.get("totalDocsExamined"),
+            "returned": stats.get("nReturned")
+        }
+        logger.warning(f"Explain for slow {record['collection']}.{record['command']} in {record['route']}: {record['explain']}")
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN_SAMPLE, SLOW_QUERY_EXPLAIN_COOLDOWN)
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[mongo_metrics, slow_query_log])
 db = client[os.environ['DB_NAME']]
 
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
+# Uploads are never modified in place: new content gets a new name, so every
+# file can be cached forever. Content-addressed files (sha256/ and their
+# derivatives/) use the content hash as a strong ETag.
+class ImmutableStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        relative = Path(full_path).relative_to(UPLOAD_DIR)
+        if relative.parts[0] in ("sha256", "derivatives"):
+            response.headers["ETag"] = f'"{relative.stem}"'
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
 # Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+app.mount("/uploads", ImmutableStaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+
+def as_utc(value) -> datetime:
+    # Handle both datetime objects and ISO strings
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    # Ensure datetime has timezone info
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+# Timestamps read back from BSON dates are naive UTC; fields that record an
+# instant are re-tagged as UTC so they serialize with their offset
+UtcDatetime = Annotated[datetime, AfterValidator(as_utc)]
 
 # Models
 class User(BaseModel):
@@ -42,14 +398,14 @@ class User(BaseModel):
     name: str
     picture: str
     role: str = "user"  # user, mentor, admin
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: UtcDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class UserSession(BaseModel):
     model_config = ConfigDict(extra="ignore")
     user_id: str
     session_token: str
-    expires_at: datetime
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    expires_at: UtcDatetime
+    created_at: UtcDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class DrugTest(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -61,7 +417,7 @@ class DrugTest(BaseModel):
     administered_by: str
     notes: Optional[str] = None
     image_url: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: UtcDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class DrugTestCreate(BaseModel):
     user_id: str
@@ -81,7 +437,7 @@ class Meeting(BaseModel):
     attended: bool
     notes: Optional[str] = None
     recorded_by: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: UtcDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class MeetingCreate(BaseModel):
     user_id: str
@@ -99,10 +455,10 @@ class RentPayment(BaseModel):
     amount: float
     confirmed: bool
     confirmed_by: Optional[str] = None
-    confirmation_date: Optional[datetime] = None
+    confirmation_date: Optional[UtcDatetime] = None
     notes: Optional[str] = None
     image_url: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: UtcDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class RentPaymentCreate(BaseModel):
     user_id: str
@@ -123,7 +479,7 @@ class Devotion(BaseModel):
     scripture_reference: Optional[str] = None
     external_links: Optional[List[str]] = None
     author_id: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: UtcDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class DevotionCreate(BaseModel):
     title: str
@@ -140,7 +496,7 @@ class ReadingMaterial(BaseModel):
     category: str
     link: Optional[str] = None
     added_by: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: UtcDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class ReadingMaterialCreate(BaseModel):
     title: str
@@ -156,7 +512,7 @@ class Message(BaseModel):
     recipient_id: Optional[str] = None  # None for broadcast
     content: str
     mentioned_users: Optional[List[str]] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: UtcDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     read: bool = False
 
 class MessageCreate(BaseModel):
@@ -175,8 +531,10 @@ class CalendarEvent(BaseModel):
     leader: Optional[str] = None
     is_recurring: bool = False
     recurrence_pattern: Optional[str] = None
+    rrule: Optional[str] = None  # RFC 5545 RRULE, expanded at query time
+    series_id: Optional[str] = None  # set on expanded occurrences
     created_by: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: UtcDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class CalendarEventCreate(BaseModel):
     title: str
@@ -187,13 +545,26 @@ class CalendarEventCreate(BaseModel):
     leader: Optional[str] = None
     is_recurring: bool = False
     recurrence_pattern: Optional[str] = None  # weekly, monthly
+    recurrence_interval: int = 1
+    recurrence_count: Optional[int] = None
+    recurrence_until: Optional[str] = None
+    rrule: Optional[str] = None  # raw RRULE, overrides the fields above
+
+class OccurrenceUpdate(BaseModel):
+    occurrence_date: str
+    cancelled: bool = False
+    title: Optional[str] = None
+    description: Optional[str] = None
+    event_date: Optional[str] = None
+    location: Optional[str] = None
+    leader: Optional[str] = None
 
 class AdminSettings(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     expected_rent_amount: float = 0.0
     rent_due_day: int = 1  # day of month
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: UtcDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class AdminSettingsUpdate(BaseModel):
     expected_rent_amount: Optional[float] = None
@@ -206,7 +577,7 @@ class DevotionLink(BaseModel):
     url: str
     category: str  # admin_added, recovery_resource
     added_by: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: UtcDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class DevotionLinkCreate(BaseModel):
     title: str
@@ -223,7 +594,10 @@ class EventRequest(BaseModel):
     event_type: str
     location: Optional[str] = None
     status: str = "pending"  # pending, approved, rejected
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: UtcDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class EventRequestBulkApprove(BaseModel):
+    request_ids: List[str]
 
 class EventRequestCreate(BaseModel):
     title: str
@@ -232,25 +606,485 @@ class EventRequestCreate(BaseModel):
     event_type: str
     location: Optional[str] = None
 
+# Principal cache: session token -> resolved User, so authenticated routes
+# skip the user_sessions/users round trips on repeat requests. The cache is
+# per process and is checked before the shared session store, so a logout
+# or role change handled by one worker reaches the others only when their
+# entry expires. The TTL is kept to a few seconds for that reason: long
+# enough to cover the burst of calls one page load makes, short enough
+# that a logged-out token stops working everywhere almost at once.
+class PrincipalCache:
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 5.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[User]:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        user, expires = entry
+        if expires <= time.monotonic():
+            del self._entries[token]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return user
+
+    def put(self, token: str, user: User, session_expires_at: datetime):
+        # Never cache past the session's own expiry
+        remaining = (session_expires_at - datetime.now(timezone.utc)).total_seconds()
+        ttl = min(self.ttl_seconds, remaining)
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        self._entries[token] = (user, time.monotonic() + ttl)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, token: str):
+        if self._entries.pop(token, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_user(self, user_id: str):
+        stale = [token for token, (user, _) in self._entries.items() if user.id == user_id]
+        for token in stale:
+            del self._entries[token]
+        self.invalidations += len(stale)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+principal_cache = PrincipalCache(
+    max_size=int(os.environ.get('PRINCIPAL_CACHE_SIZE', '1024')),
+    ttl_seconds=float(os.environ.get('PRINCIPAL_CACHE_TTL', '5')),
+)
+
+# Signed session tokens: when SESSION_SIGNING_KEY is set, create_session issues
+# self-contained HMAC tokens that get_current_user verifies without Mongo.
+# Tokens without the prefix fall back to the user_sessions lookup.
+SESSION_LIFETIME = timedelta(days=7)
+SIGNED_TOKEN_PREFIX = "s1."
+SESSION_SIGNING_KEY = os.environ.get('SESSION_SIGNING_KEY', '').encode()
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(SESSION_SIGNING_KEY, payload.encode(), hashlib.sha256).digest())
+
+def issue_signed_token(user: dict, expires_at: datetime) -> str:
+    claims = {
+        "sub": user["id"],
+        "role": user.get("role", "user"),
+        "email": user["email"],
+        "name": user["name"],
+        "picture": user.get("picture", ""),
+        "iat": time.time(),
+        "exp": expires_at.timestamp(),
+        "jti": uuid.uuid4().hex,
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{SIGNED_TOKEN_PREFIX}{payload}.{_sign(payload)}"
+
+def decode_signed_token(token: str) -> Optional[dict]:
+    try:
+        payload, signature = token[len(SIGNED_TOKEN_PREFIX):].split(".")
+    except ValueError:
+        return None
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    return claims
+
+class SessionRevocations:
+    # jti -> exp for logged-out tokens; user_id -> (not_before, exp) for role
+    # changes. Persisted to session_revocations and re-read every refresh_seconds
+    # so other workers pick up revocations without a per-request query.
+    # Each entry also carries expires_at as a BSON date for the TTL index.
+    def __init__(self, refresh_seconds: float = 30.0):
+        self.refresh_seconds = refresh_seconds
+        self._tokens: dict = {}
+        self._users: dict = {}
+        self._refreshed_at = 0.0
+        self._refreshing = None
+
+    async def revoke_token(self, claims: dict):
+        self._tokens[claims["jti"]] = claims["exp"]
+        await db.session_revocations.update_one(
+            {"jti": claims["jti"]},
+            {"$set": {
+                "jti": claims["jti"],
+                "exp": claims["exp"],
+                "expires_at": datetime.fromtimestamp(claims["exp"], timezone.utc)
+            }},
+            upsert=True
+        )
+
+    async def revoke_user(self, user_id: str):
+        not_before = time.time()
+        exp = not_before + SESSION_LIFETIME.total_seconds()
+        self._users[user_id] = (not_before, exp)
+        await db.session_revocations.update_one(
+            {"user_id": user_id},
+            {"$set": {
+                "user_id": user_id,
+                "not_before": not_before,
+                "exp": exp,
+                "expires_at": datetime.fromtimestamp(exp, timezone.utc)
+            }},
+            upsert=True
+        )
+
+    async def refresh(self):
+        now = time.time()
+        self._refreshed_at = now
+        tokens, users = {}, {}
+        async for entry in db.session_revocations.find({"exp": {"$gt": now}}, {"_id": 0}):
+            if entry.get("jti"):
+                tokens[entry["jti"]] = entry["exp"]
+            elif entry.get("user_id"):
+                users[entry["user_id"]] = (entry["not_before"], entry["exp"])
+        self._tokens, self._users = tokens, users
+
+    async def is_revoked(self, claims: dict) -> bool:
+        if time.time() - self._refreshed_at > self.refresh_seconds:
+            # One reload per interval, however many requests notice it is due
+            if self._refreshing is None or self._refreshing.done():
+                self._refreshing = asyncio.ensure_future(self.refresh())
+            await asyncio.shield(self._refreshing)
+        if claims["jti"] in self._tokens:
+            return True
+        user_entry = self._users.get(claims["sub"])
+        return bool(user_entry and claims["iat"] <= user_entry[0])
+
+session_revocations = SessionRevocations(
+    refresh_seconds=float(os.environ.get('SESSION_REVOCATION_REFRESH', '30')),
+)
+
+# Session store: opaque (unsigned) session tokens are kept by a pluggable
+# backend chosen with SESSION_STORE. "mongo" keeps them in user_sessions and
+# sweeps expired rows in the background; "memory" is for a single worker;
+# "redis" talks RESP to SESSION_REDIS_URL and lets Redis expire the keys, so
+# any number of workers share sessions without a growing collection.
+class SessionStoreError(Exception):
+    pass
+
+class SessionStore:
+    name = "base"
+
+    def __init__(self, sweep_seconds: float = 0.0):
+        self.sweep_seconds = sweep_seconds
+        self.swept = 0
+        self.last_sweep = None
+        self._task = None
+
+    async def start(self):
+        if self.sweep_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_seconds)
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Session sweep failed: {e}")
+
+    async def sweep(self) -> int:
+        # Backends that expire entries themselves have nothing to sweep
+        return 0
+
+    async def create(self, token: str, user_id: str, expires_at: datetime):
+        raise NotImplementedError
+
+    async def get(self, token: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def delete(self, token: str):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "sweep_seconds": self.sweep_seconds,
+            "swept": self.swept,
+            "last_sweep": self.last_sweep,
+        }
+
+class MongoSessionStore(SessionStore):
+    # The TTL index on expires_at removes most expired rows; the sweeper also
+    # catches ones it never will, such as expiries still stored as ISO strings
+    name = "mongo"
+
+    def __init__(self, sweep_seconds: float = 600.0, batch_size: int = 1000):
+        super().__init__(sweep_seconds)
+        self.batch_size = batch_size
+
+    async def create(self, token: str, user_id: str, expires_at: datetime):
+        await db.user_sessions.insert_one({
+            "user_id": user_id,
+            "session_token": token,
+            "expires_at": expires_at,
+            "created_at": datetime.now(timezone.utc)
+        })
+
+    async def get(self, token: str) -> Optional[dict]:
+        return await db.user_sessions.find_one({"session_token": token}, {"_id": 0, "user_id": 1, "expires_at": 1})
+
+    async def delete(self, token: str):
+        await db.user_sessions.delete_one({"session_token": token})
+
+    async def sweep(self) -> int:
+        now = datetime.now(timezone.utc)
+        expired = {"$or": [{"expires_at": {"$lt": now}}, {"expires_at": {"$lt": now.isoformat()}}]}
+        removed = 0
+        # Small batches so a first sweep over a large backlog does not hold
+        # one long delete against the collection
+        while True:
+            ids = [doc["_id"] for doc in await db.user_sessions.find(expired, {"_id": 1}).limit(self.batch_size).to_list(self.batch_size)]
+            if not ids:
+                break
+            result = await db.user_sessions.delete_many({"_id": {"$in": ids}})
+            removed += result.deleted_count
+            if len(ids) < self.batch_size:
+                break
+            await asyncio.sleep(0)
+        self.swept += removed
+        self.last_sweep = now
+        return removed
+
+class MemorySessionStore(SessionStore):
+    # Process-local: only correct with a single worker
+    name = "memory"
+
+    def __init__(self, sweep_seconds: float = 60.0):
+        super().__init__(sweep_seconds)
+        self._sessions: dict = {}
+
+    async def create(self, token: str, user_id: str, expires_at: datetime):
+        self._sessions[token] = {"user_id": user_id, "expires_at": expires_at}
+
+    async def get(self, token: str) -> Optional[dict]:
+        return self._sessions.get(token)
+
+    async def delete(self, token: str):
+        self._sessions.pop(token, None)
+
+    async def sweep(self) -> int:
+        now = datetime.now(timezone.utc)
+        expired = [token for token, session in self._sessions.items() if session["expires_at"] <= now]
+        for token in expired:
+            del self._sessions[token]
+        self.swept += len(expired)
+        self.last_sweep = now
+        return len(expired)
+
+class RedisSessionStore(SessionStore):
+    # Speaks just enough RESP for SET/GET/DEL over a small connection pool;
+    # each key carries a PX expiry matching the session lifetime.
+    # redis_stub.py is a local stand-in for testing without a Redis server.
+    name = "redis"
+
+    def __init__(self, url: str, pool_size: int = 10, timeout: float = 2.0, key_prefix: str = "session:"):
+        super().__init__()
+        parsed = urllib.parse.urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.database = int(parsed.path.lstrip("/") or 0)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self._idle: list = []
+
+    async def stop(self):
+        await super().stop()
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    async def _connect(self):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        connection = (reader, writer)
+        try:
+            if self.password:
+                await self._call(connection, "AUTH", self.password)
+            if self.database:
+                await self._call(connection, "SELECT", str(self.database))
+        except BaseException:
+            writer.close()
+            raise
+        return connection
+
+    @staticmethod
+    def _encode(*args: str) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg.encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _read_reply(self, reader):
+        line = await reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionResetError("Connection closed by session store")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise SessionStoreError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            return (await reader.readexactly(length + 2))[:-2].decode()
+        if kind == b"*":
+            length = int(body)
+            if length < 0:
+                return None
+            return [await self._read_reply(reader) for _ in range(length)]
+        raise SessionStoreError(f"Unexpected reply from session store: {line!r}")
+
+    async def _call(self, connection, *args: str):
+        reader, writer = connection
+        writer.write(self._encode(*args))
+        await writer.drain()
+        return await asyncio.wait_for(self._read_reply(reader), self.timeout)
+
+    async def execute(self, *args: str):
+        # Socket-level failures surface as SessionStoreError, so callers
+        # handle an unreachable Redis the same way as an error reply. A
+        # pooled connection may have been dropped by a Redis restart or an
+        # idle timeout since its last use, so one that fails other than by
+        # timing out earns a single retry on a fresh connection.
+        pooled = self._idle.pop() if self._idle else None
+        try:
+            return await self._execute_on(pooled, *args)
+        except (OSError, asyncio.IncompleteReadError) as e:
+            if pooled is None or isinstance(e, asyncio.TimeoutError):
+                raise SessionStoreError(f"Session store unreachable: {e!r}") from e
+        try:
+            return await self._execute_on(None, *args)
+        except (OSError, asyncio.IncompleteReadError) as e:
+            raise SessionStoreError(f"Session store unreachable: {e!r}") from e
+
+    async def _execute_on(self, connection, *args: str):
+        if connection is None:
+            connection = await self._connect()
+        try:
+            reply = await self._call(connection, *args)
+        except BaseException:
+            # The reply stream may be out of step; never reuse the connection
+            connection[1].close()
+            raise
+        if len(self._idle) < self.pool_size:
+            self._idle.append(connection)
+        else:
+            connection[1].close()
+        return reply
+
+    async def create(self, token: str, user_id: str, expires_at: datetime):
+        ttl_ms = int((expires_at - datetime.now(timezone.utc)).total_seconds() * 1000)
+        if ttl_ms <= 0:
+            return
+        value = json.dumps({"user_id": user_id, "expires_at": expires_at.isoformat()})
+        await self.execute("SET", self.key_prefix + token, value, "PX", str(ttl_ms))
+
+    async def get(self, token: str) -> Optional[dict]:
+        value = await self.execute("GET", self.key_prefix + token)
+        return json.loads(value) if value else None
+
+    async def delete(self, token: str):
+        await self.execute("DEL", self.key_prefix + token)
+
+def build_session_store() -> SessionStore:
+    backend = os.environ.get('SESSION_STORE', 'mongo')
+    if backend == "mongo":
+        return MongoSessionStore(
+            sweep_seconds=float(os.environ.get('SESSION_SWEEP_SECONDS', '600')),
+            batch_size=int(os.environ.get('SESSION_SWEEP_BATCH', '1000'))
+        )
+    if backend == "memory":
+        return MemorySessionStore(sweep_seconds=float(os.environ.get('SESSION_SWEEP_SECONDS', '60')))
+    if backend == "redis":
+        return RedisSessionStore(
+            os.environ.get('SESSION_REDIS_URL', 'redis://127.0.0.1:6379/0'),
+            pool_size=int(os.environ.get('SESSION_REDIS_POOL', '10'))
+        )
+    raise ValueError(f"Unknown SESSION_STORE: {backend}")
+
+session_store = build_session_store()
+
 # Auth helper
 async def get_current_user(session_token: Optional[str] = None, authorization: Optional[str] = None) -> Optional[User]:
     token = session_token or (authorization.replace('Bearer ', '') if authorization else None)
     if not token:
         return None
     
-    session = await db.user_sessions.find_one({"session_token": token})
+    if token.startswith(SIGNED_TOKEN_PREFIX) and SESSION_SIGNING_KEY:
+        claims = decode_signed_token(token)
+        if not claims or await session_revocations.is_revoked(claims):
+            return None
+        return User(
+            id=claims["sub"],
+            email=claims["email"],
+            name=claims["name"],
+            picture=claims["picture"],
+            role=claims["role"]
+        )
+    
+    cached = principal_cache.get(token)
+    if cached:
+        return cached
+    
+    # A store outage is the server's problem, not a logged-out user
+    try:
+        session = await session_store.get(token)
+    except SessionStoreError:
+        raise HTTPException(status_code=503, detail="Session store unavailable")
     if not session:
         return None
     
-    # Handle both datetime objects and ISO strings
-    expires_at = session['expires_at']
-    if isinstance(expires_at, str):
-        expires_at = datetime.fromisoformat(expires_at)
-    elif isinstance(expires_at, datetime):
-        # Ensure datetime has timezone info
-        if expires_at.tzinfo is None:
-            expires_at = expires_at.replace(tzinfo=timezone.utc)
-    
+    expires_at = as_utc(session['expires_at'])
     if expires_at < datetime.now(timezone.utc):
         return None
     
@@ -258,7 +1092,379 @@ async def get_current_user(session_token: Optional[str] = None, authorization: O
     if not user_doc:
         return None
     
-    return User(**user_doc)
+    user = User(**user_doc)
+    principal_cache.put(token, user, expires_at)
+    return user
+
+# Keyset pagination: list endpoints page on (sort_field, id) and return the
+# opaque cursor for the next page in the X-Next-Cursor header
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(doc: dict, sort_field: str, tiebreak: str = "id") -> str:
+    # Sort fields are stored either as BSON dates or ISO strings; keep the type
+    value = doc.get(sort_field)
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    return _b64encode(json.dumps([value, doc[tiebreak]]).encode())
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        value, last_id = json.loads(_b64decode(cursor))
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["$date"])
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, last_id
+
+async def keyset_page(
+    collection,
+    query: dict,
+    sort_field: str,
+    direction: int,
+    limit: int,
+    cursor: Optional[str],
+    projection: Optional[dict] = None,
+    tiebreak: str = "id"
+) -> List[dict]:
+    # Returns up to limit + 1 documents; the extra one signals another page.
+    # A unique sort field can be its own tiebreak.
+    sort = [(sort_field, direction)]
+    if tiebreak != sort_field:
+        sort.append((tiebreak, direction))
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        op = "$lt" if direction == DESCENDING else "$gt"
+        after = [{sort_field: {op: value}}]
+        if tiebreak != sort_field:
+            after.append({sort_field: value, tiebreak: {op: last_id}})
+        # While ISO strings are still being migrated the sort runs across
+        # both types (every string sorts before every date), but $lt/$gt
+        # only compare within one, so add the other type's side explicitly
+        if isinstance(value, datetime) and op == "$lt":
+            after.append({sort_field: {"$type": "string"}})
+        elif isinstance(value, str) and op == "$gt":
+            after.append({sort_field: {"$type": "date"}})
+        query = {"$and": [query, {"$or": after}]}
+    
+    return await collection.find(query, projection or {"_id": 0}).sort(sort).limit(limit + 1).to_list(limit + 1)
+
+async def paginate(
+    response: Response,
+    collection,
+    query: dict,
+    sort_field: str,
+    direction: int,
+    limit: int,
+    cursor: Optional[str],
+    projection: Optional[dict] = None,
+    tiebreak: str = "id"
+) -> List[dict]:
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    docs = await keyset_page(collection, query, sort_field, direction, limit, cursor, projection, tiebreak)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(docs[-1], sort_field, tiebreak)
+    return docs
+
+# Fast JSON path (FAST_JSON_RESPONSES=true): list endpoints project exactly
+# the response model's fields in Mongo and hand the documents straight to
+# orjson, skipping response_model re-validation. The documents are our own
+# writes, so validation adds nothing but CPU. Fields missing from a stored
+# document are omitted rather than filled with the model default.
+# BSON dates come back naive, so the model's UtcDatetime fields are tagged
+# UTC here as their validator would, and both paths write instants with Z.
+FAST_JSON_RESPONSES = os.environ.get('FAST_JSON_RESPONSES', 'false').lower() == 'true'
+
+def model_projection(model) -> dict:
+    return {"_id": 0, **{field: 1 for field in model.model_fields}}
+
+def _tags_utc(annotation, metadata=()) -> bool:
+    if any(getattr(item, "func", None) is as_utc for item in metadata):
+        return True
+    # Optional[UtcDatetime] keeps the Annotated inside the Union
+    return any(_tags_utc(arg, getattr(arg, "__metadata__", ())) for arg in get_args(annotation))
+
+@functools.lru_cache(maxsize=None)
+def utc_fields(model) -> tuple:
+    return tuple(name for name, field in model.model_fields.items() if _tags_utc(field.annotation, field.metadata))
+
+def fast_json(docs: List[dict], model) -> bytes:
+    fields = utc_fields(model)
+    tagged = []
+    for doc in docs:
+        naive = [field for field in fields if isinstance(doc.get(field), datetime) and doc[field].tzinfo is None]
+        if naive:
+            doc = {**doc, **{field: doc[field].replace(tzinfo=timezone.utc) for field in naive}}
+        tagged.append(doc)
+    return orjson.dumps(tagged, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+def list_response(response: Response, docs: List[dict], model):
+    if not FAST_JSON_RESPONSES:
+        return docs
+    # Returning a Response bypasses the injected one, so carry its headers
+    return Response(fast_json(docs, model), media_type="application/json", headers=dict(response.headers))
+
+def date_range_filter(field: str, start: Optional[str], end: Optional[str]) -> dict:
+    # Dates may be stored as BSON dates or ISO strings, so match either form
+    if not start and not end:
+        return {}
+    as_date, as_string = {}, {}
+    try:
+        if start:
+            as_date["$gte"] = datetime.fromisoformat(start)
+            as_string["$gte"] = as_date["$gte"].isoformat()
+        if end:
+            as_date["$lt"] = datetime.fromisoformat(end)
+            as_string["$lt"] = as_date["$lt"].isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    return {"$or": [{field: as_date}, {field: as_string}]}
+
+# Conditional GET: read-mostly collections carry a version in
+# collection_versions that their create endpoints bump. Reads compare it to
+# If-None-Match / If-Modified-Since and answer 304 before querying.
+async def collection_version(name: str) -> dict:
+    return await db.collection_versions.find_one({"collection": name}, {"_id": 0}) or {"version": 0}
+
+async def bump_collection_version(name: str):
+    await db.collection_versions.update_one(
+        {"collection": name},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc).replace(microsecond=0)}},
+        upsert=True
+    )
+    reference_cache.invalidate(name)
+
+def not_modified(request: Request, response: Response, name: str, version: dict, scope: str = "") -> Optional[Response]:
+    # The ETag covers the path and query string too, since they change the
+    # body, plus any scope the handler resolves outside of them
+    params = hashlib.sha1(f"{request.url.path}?{request.query_params}#{scope}".encode()).hexdigest()[:12]
+    headers = {
+        "ETag": f'"{name}-{version["version"]}-{params}"',
+        "Cache-Control": "private, no-cache"
+    }
+    # HTTP dates only have whole seconds. A version stamped in the current
+    # second may change again within it, so it gets no Last-Modified yet;
+    # otherwise a client could send back that second and get a stale 304.
+    modified = as_utc(version["updated_at"]).replace(microsecond=0) if version.get("updated_at") else None
+    if modified and modified >= datetime.now(timezone.utc).replace(microsecond=0):
+        modified = None
+    if modified:
+        headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+    response.headers.update(headers)
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        if headers["ETag"] in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        return None
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modified:
+        try:
+            if modified <= parsedate_to_datetime(if_modified_since):
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    return None
+
+# Reference data cache: admin settings and the admin-written lists
+# (devotions, reading materials, devotion links) are read on most page loads
+# but change rarely. Entries are keyed by a namespace tuple and expire per
+# key; list pages include the collection version in the key, so a write on
+# another worker is picked up as soon as the version moves. Concurrent misses
+# for the same key share one load instead of each querying Mongo. Every
+# caller gets its own copy, so a handler editing a result in place cannot
+# change what the next request reads.
+class ReadThroughCache:
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 60.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._loading: "dict[tuple, asyncio.Task]" = {}
+        # Bumped per namespace by invalidate, so a write to one collection
+        # does not throw away loads in flight for the others
+        self._generations: "dict[str, int]" = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get(self, key: tuple, loader, ttl_seconds: Optional[float] = None):
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(value)
+            del self._entries[key]
+        
+        task = self._loading.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, loader, ttl_seconds))
+            self._loading[key] = task
+        # Shielded so one caller disconnecting does not cancel everyone's load
+        return copy.deepcopy(await asyncio.shield(task))
+
+    async def _load(self, key: tuple, loader, ttl_seconds: Optional[float]):
+        generation = self._generations.get(key[0], 0)
+        try:
+            value = await loader()
+        finally:
+            if self._loading.get(key) is asyncio.current_task():
+                del self._loading[key]
+        # A load that raced an invalidation may have read the old data
+        if generation == self._generations.get(key[0], 0):
+            self.put(key, value, ttl_seconds)
+        return value
+
+    def put(self, key: tuple, value, ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, namespace: str):
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        stale = [key for key in self._entries if key[0] == namespace]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+        # Callers arriving after the write start a fresh load rather than
+        # joining one that may have read the old data
+        for key in [key for key in self._loading if key[0] == namespace]:
+            del self._loading[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "loading": len(self._loading),
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+reference_cache = ReadThroughCache(
+    max_size=int(os.environ.get('REFERENCE_CACHE_SIZE', '256')),
+    ttl_seconds=float(os.environ.get('REFERENCE_CACHE_TTL', '300'))
+)
+# Settings have no version to key on, so another worker's update is only
+# seen once this shorter TTL runs out
+ADMIN_SETTINGS_CACHE_TTL = float(os.environ.get('ADMIN_SETTINGS_CACHE_TTL', '30'))
+
+async def cached_page(response: Response, name: str, version: dict, collection, sort_field: str,
+                      limit: int, cursor: Optional[str], projection: dict) -> List[dict]:
+    async def load():
+        page = Response()
+        docs = await paginate(page, collection, {}, sort_field, DESCENDING, limit, cursor, projection)
+        return docs, page.headers.get(NEXT_CURSOR_HEADER)
+    
+    docs, next_cursor = await reference_cache.get((name, version["version"], limit, cursor), load)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return docs
+
+async def cached_admin_settings() -> Optional[dict]:
+    async def load():
+        return await db.admin_settings.find_one({}, {"_id": 0})
+    return await reference_cache.get(("admin_settings",), load, ADMIN_SETTINGS_CACHE_TTL)
+
+# OAuth session exchange: one pooled keep-alive client with timeouts,
+# bounded retries on transport errors and 5xx, and a circuit breaker so an
+# unavailable provider fails logins fast instead of piling them up.
+# SESSION_DATA_URL can point at session_stub.py for offline testing.
+SESSION_DATA_URL = os.environ.get(
+    'SESSION_DATA_URL',
+    'https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data'
+)
+SESSION_EXCHANGE_RETRIES = int(os.environ.get('SESSION_EXCHANGE_RETRIES', '2'))
+SESSION_EXCHANGE_TIMEOUT = httpx.Timeout(
+    float(os.environ.get('SESSION_EXCHANGE_TIMEOUT', '5')),
+    connect=float(os.environ.get('SESSION_EXCHANGE_CONNECT_TIMEOUT', '2'))
+)
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        # Half-open lets calls through; the first result closes or re-opens
+        if self.state == "open":
+            raise CircuitOpenError()
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+session_exchange_breaker = CircuitBreaker(
+    failure_threshold=int(os.environ.get('SESSION_EXCHANGE_BREAKER_THRESHOLD', '5')),
+    reset_seconds=float(os.environ.get('SESSION_EXCHANGE_BREAKER_RESET', '30')),
+)
+_session_http: Optional[httpx.AsyncClient] = None
+
+def session_http() -> httpx.AsyncClient:
+    global _session_http
+    if _session_http is None or _session_http.is_closed:
+        _session_http = httpx.AsyncClient(
+            timeout=SESSION_EXCHANGE_TIMEOUT,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=10, keepalive_expiry=60)
+        )
+    return _session_http
+
+async def fetch_session_data(session_id: str) -> dict:
+    session_exchange_breaker.before_call()
+    last_error = None
+    for attempt in range(SESSION_EXCHANGE_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(0.1 * 2 ** (attempt - 1))
+        try:
+            resp = await session_http().get(SESSION_DATA_URL, headers={"X-Session-ID": session_id})
+        except httpx.TransportError as e:
+            last_error = e
+            continue
+        if resp.status_code >= 500:
+            last_error = httpx.HTTPStatusError(f"Upstream returned {resp.status_code}", request=resp.request, response=resp)
+            continue
+        # The provider answered: a 4xx is the caller's problem, not an outage
+        session_exchange_breaker.record_success()
+        resp.raise_for_status()
+        return resp.json()
+    session_exchange_breaker.record_failure()
+    raise last_error
 
 # Auth endpoints
 @api_router.post("/auth/session")
@@ -268,12 +1474,13 @@ async def create_session(response: Response, x_session_id: Optional[str] = Heade
     
     # Get session data from Emergent
     try:
-        resp = requests.get(
-            "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-            headers={"X-Session-ID": x_session_id}
-        )
-        resp.raise_for_status()
-        session_data = resp.json()
+        session_data = await fetch_session_data(x_session_id)
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="Login provider unavailable, try again shortly")
+    except (httpx.TransportError, httpx.HTTPStatusError) as e:
+        if isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500:
+            raise HTTPException(status_code=400, detail=f"Invalid session: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Login provider unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid session: {str(e)}")
     
@@ -289,21 +1496,23 @@ async def create_session(response: Response, x_session_id: Optional[str] = Heade
             "name": session_data["name"],
             "picture": session_data["picture"],
             "role": "user",
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": datetime.now(timezone.utc)
         }
         await db.users.insert_one(user_doc)
     else:
         user_id = user["id"]
+        user_doc = user
     
     # Create session
-    session_token = session_data["session_token"]
-    session_doc = {
-        "user_id": user_id,
-        "session_token": session_token,
-        "expires_at": (datetime.now(timezone.utc) + timedelta(days=7)).isoformat(),
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    await db.user_sessions.insert_one(session_doc)
+    expires_at = datetime.now(timezone.utc) + SESSION_LIFETIME
+    if SESSION_SIGNING_KEY:
+        session_token = issue_signed_token(user_doc, expires_at)
+    else:
+        session_token = session_data["session_token"]
+        try:
+            await session_store.create(session_token, user_id, expires_at)
+        except SessionStoreError:
+            raise HTTPException(status_code=503, detail="Session store unavailable")
     
     # Set cookie
     response.set_cookie(
@@ -313,7 +1522,7 @@ async def create_session(response: Response, x_session_id: Optional[str] = Heade
         secure=True,
         samesite="none",
         path="/",
-        max_age=7*24*60*60
+        max_age=int(SESSION_LIFETIME.total_seconds())
     )
     
     return {"session_token": session_token, "user_id": user_id}
@@ -335,14 +1544,23 @@ async def logout(
     authorization: Optional[str] = Header(None)
 ):
     token = session_token or (authorization.replace('Bearer ', '') if authorization else None)
-    if token:
-        await db.user_sessions.delete_one({"session_token": token})
+    if token and token.startswith(SIGNED_TOKEN_PREFIX) and SESSION_SIGNING_KEY:
+        claims = decode_signed_token(token)
+        if claims:
+            await session_revocations.revoke_token(claims)
+    elif token:
+        principal_cache.invalidate(token)
+        try:
+            await session_store.delete(token)
+        except SessionStoreError:
+            raise HTTPException(status_code=503, detail="Session store unavailable")
     response.delete_cookie("session_token", path="/")
     return {"message": "Logged out"}
 
 # User management
 @api_router.get("/users", response_model=List[User])
 async def get_users(
+    response: Response,
     session_token: Optional[str] = Cookie(None),
     authorization: Optional[str] = Header(None)
 ):
@@ -350,8 +1568,8 @@ async def get_users(
     if not user or user.role not in ["admin", "mentor"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    users = await db.users.find({}, {"_id": 0}).to_list(1000)
-    return users
+    users = await db.users.find({}, model_projection(User)).to_list(1000)
+    return list_response(response, users, User)
 
 @api_router.patch("/users/{user_id}/role")
 async def update_user_role(
@@ -365,75 +1583,686 @@ async def update_user_role(
         raise HTTPException(status_code=403, detail="Admin only")
     
     await db.users.update_one({"id": user_id}, {"$set": {"role": role}})
+    principal_cache.invalidate_user(user_id)
+    if SESSION_SIGNING_KEY:
+        await session_revocations.revoke_user(user_id)
     return {"message": "Role updated"}
 
-# File upload
-@api_router.post("/upload")
-async def upload_file(
-    file: UploadFile = File(...),
+@api_router.get("/admin/principal-cache")
+async def get_principal_cache_stats(
     session_token: Optional[str] = Cookie(None),
     authorization: Optional[str] = Header(None)
 ):
     user = await get_current_user(session_token, authorization)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    # Generate unique filename
-    file_ext = Path(file.filename).suffix
-    filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = UPLOAD_DIR / filename
-    
-    # Save file
-    contents = await file.read()
-    with open(file_path, "wb") as f:
-        f.write(contents)
+    if not user or user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
     
-    # Return URL
-    return {"url": f"/uploads/{filename}"}
+    return principal_cache.stats()
 
-# Drug tests
-@api_router.post("/drug-tests", response_model=DrugTest)
-async def create_drug_test(
-    data: DrugTestCreate,
+@api_router.get("/admin/session-store")
+async def get_session_store_stats(
     session_token: Optional[str] = Cookie(None),
     authorization: Optional[str] = Header(None)
 ):
     user = await get_current_user(session_token, authorization)
-    if not user or user.role not in ["admin", "mentor"]:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    
-    test_dict = data.model_dump()
-    test_dict["test_date"] = datetime.fromisoformat(test_dict["test_date"]).isoformat()
-    test_obj = DrugTest(**test_dict)
-    doc = test_obj.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
+    if not user or user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
     
-    await db.drug_tests.insert_one(doc)
-    return test_obj
+    return session_store.stats()
 
-@api_router.get("/drug-tests", response_model=List[DrugTest])
-async def get_drug_tests(
-    user_id: Optional[str] = None,
+@api_router.get("/admin/reference-cache")
+async def get_reference_cache_stats(
     session_token: Optional[str] = Cookie(None),
     authorization: Optional[str] = Header(None)
 ):
     user = await get_current_user(session_token, authorization)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+    if not user or user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
     
-    query = {}
-    if user.role == "user":
-        query["user_id"] = user.id
-    elif user_id:
-        query["user_id"] = user_id
+    return reference_cache.stats()
+
+# File upload: the body is streamed to disk in chunks with file writes run
+# off the event loop; oversized requests are rejected before the body is read
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', str(10 * 1024 * 1024)))
+# The stored file's extension, and so the Content-Type /uploads serves it
+# with, comes from the declared type, and the content has to start with
+# that type's signature. A client filename never picks the extension.
+HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"mif1", b"msf1"}
+UPLOAD_TYPES = {
+    "image/jpeg": (".jpg", lambda head: head.startswith(b"\xff\xd8\xff")),
+    "image/png": (".png", lambda head: head.startswith(b"\x89PNG\r\n\x1a\n")),
+    "image/webp": (".webp", lambda head: head[:4] == b"RIFF" and head[8:12] == b"WEBP"),
+    "image/heic": (".heic", lambda head: head[4:8] == b"ftyp" and head[8:12] in HEIF_BRANDS),
+    "image/heif": (".heif", lambda head: head[4:8] == b"ftyp" and head[8:12] in HEIF_BRANDS),
+    "application/pdf": (".pdf", lambda head: head.startswith(b"%PDF-")),
+}
+# The environment can narrow the list but not add types without a signature
+UPLOAD_ALLOWED_TYPES = set(os.environ.get(
+    'UPLOAD_ALLOWED_TYPES',
+    'image/jpeg,image/png,image/webp,image/heic,image/heif,application/pdf'
+).split(',')) & set(UPLOAD_TYPES)
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Room for multipart boundaries and part headers on top of the file itself
+UPLOAD_MULTIPART_OVERHEAD = 16 * 1024
+
+class UploadSizeLimitMiddleware:
+    def __init__(self, app, path: str = "/api/upload"):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+        
+        limit = UPLOAD_MAX_BYTES + UPLOAD_MULTIPART_OVERHEAD
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None:
+            try:
+                declared = int(content_length)
+            except ValueError:
+                response = JSONResponse(status_code=400, content={"detail": "Invalid Content-Length"})
+                await response(scope, receive, send)
+                return
+            if declared > limit:
+                upload_metrics.rejected += 1
+                response = JSONResponse(status_code=413, content={"detail": "File too large"})
+                await response(scope, receive, send)
+                return
+        
+        # A chunked body has no length up front, so count it as it arrives.
+        # The form parser re-raises HTTPException, which the app answers.
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    upload_metrics.rejected += 1
+                    raise HTTPException(status_code=413, detail="File too large")
+            return message
+        
+        await self.app(scope, limited_receive, send)
+
+class UploadMetrics:
+    def __init__(self):
+        self.uploads = 0
+        self.rejected = 0
+        self.bytes = 0
+        self.seconds_total = 0.0
+        self.seconds_max = 0.0
+
+    def record(self, size: int, seconds: float):
+        self.uploads += 1
+        self.bytes += size
+        self.seconds_total += seconds
+        self.seconds_max = max(self.seconds_max, seconds)
+
+    def stats(self) -> dict:
+        return {
+            "uploads": self.uploads,
+            "rejected": self.rejected,
+            "bytes": self.bytes,
+            "seconds_total": self.seconds_total,
+            "seconds_avg": self.seconds_total / self.uploads if self.uploads else 0.0,
+            "seconds_max": self.seconds_max,
+        }
+
+upload_metrics = UploadMetrics()
+
+def _write_chunk(out, digest, chunk: bytes):
+    digest.update(chunk)
+    out.write(chunk)
+
+async def save_upload(file: UploadFile) -> tuple:
+    # Stream to a private temporary file while hashing; the caller moves it
+    # into content-addressed storage. A failed, oversized or mislabelled
+    # upload never leaves a partial file behind.
+    partial_path = UPLOAD_TMP_DIR / f"{uuid.uuid4()}.part"
+    digest = hashlib.sha256()
+    _, matches_signature = UPLOAD_TYPES[file.content_type]
+    out = await asyncio.to_thread(open, partial_path, "wb")
+    size = 0
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            if size == 0 and not matches_signature(chunk[:16]):
+                raise HTTPException(status_code=415, detail=f"File content is not {file.content_type}")
+            size += len(chunk)
+            if size > UPLOAD_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="File too large")
+            await asyncio.to_thread(_write_chunk, out, digest, chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty file")
+    except BaseException:
+        await asyncio.to_thread(out.close)
+        await asyncio.to_thread(partial_path.unlink, True)
+        raise
+    await asyncio.to_thread(out.close)
+    return partial_path, digest.hexdigest(), size
+
+def content_path(content_hash: str, file_ext: str) -> Path:
+    # Sharded as sha256/ab/cd/<hash><ext> to keep directories small
+    return Path("sha256") / content_hash[:2] / content_hash[2:4] / f"{content_hash}{file_ext.lower()}"
+
+def _store_content(partial_path: Path, target: Path) -> bool:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.exists():
+        partial_path.unlink()
+        return False
+    partial_path.replace(target)
+    return True
+
+# Image derivatives: thumbnails and WebP copies are built in a process pool
+# after the upload returns. upload_derivatives maps an original URL to its
+# derivatives so list endpoints can hand out the small version.
+IMAGE_DERIVATIVE_TYPES = {"image/jpeg", "image/png", "image/webp"}
+THUMBNAIL_SIZE = (320, 320)
+WEBP_MAX_SIZE = (1280, 1280)
+IMAGE_VARIANTS = {"thumbnail": "thumbnail_url", "webp": "webp_url"}
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+# Created by the start_image_pool startup hook, so importing server (the
+# maintenance commands, load_test, benchmarks) never forks workers
+image_pool = None
+_derivative_tasks = set()
+
+def build_image_derivatives(source: str, thumbnail_path: str, webp_path: str):
+    # Runs in a worker process. Pixels are re-encoded from scratch, so no
+    # EXIF (including GPS) is carried over; orientation is applied first.
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+        
+        webp = image.copy()
+        webp.thumbnail(WEBP_MAX_SIZE)
+        webp.save(webp_path, "WEBP", quality=80, method=4)
+        
+        thumbnail = image.convert("RGB")
+        thumbnail.thumbnail(THUMBNAIL_SIZE)
+        thumbnail.save(thumbnail_path, "JPEG", quality=75, optimize=True)
+
+# Originals are stored as uploaded apart from their metadata: EXIF (with
+# GPS), XMP and IPTC blocks are cut out of JPEG, PNG and WebP files without
+# re-encoding the pixels, before the content hash is taken. A JPEG keeps only
+# its orientation tag so it still displays the right way up. HEIC/HEIF and
+# PDF are kept byte for byte; nothing here can rewrite those containers
+# without re-encoding them, and clients that upload them choose to.
+JPEG_METADATA_MARKERS = {0xE1, 0xED}  # APP1 (Exif, XMP), APP13 (IPTC)
+PNG_METADATA_CHUNKS = {b"eXIf", b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+WEBP_METADATA_CHUNKS = {b"EXIF", b"XMP "}
+
+def _strip_jpeg(data: bytes) -> bytes:
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("Not a JPEG")
+    out, pos = [data[:2]], 2
+    while pos < len(data):
+        if pos + 2 > len(data):
+            raise ValueError("Truncated JPEG")
+        if data[pos] != 0xFF:
+            raise ValueError("Corrupt JPEG segment")
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker in (0xDA, 0xD9):
+            # Start of scan / end of image: the rest is image data
+            out.append(data[pos:])
+            break
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            out.append(data[pos:pos + 2])
+            pos += 2
+            continue
+        if pos + 4 > len(data):
+            raise ValueError("Truncated JPEG")
+        end = pos + 2 + int.from_bytes(data[pos + 2:pos + 4], "big")
+        if end > len(data) or end < pos + 4:
+            raise ValueError("Corrupt JPEG segment")
+        segment = data[pos:end]
+        if marker not in JPEG_METADATA_MARKERS:
+            out.append(segment)
+        elif segment[4:10] == b"Exif\x00\x00":
+            exif = Image.Exif()
+            try:
+                exif.load(segment[4:])
+            except Exception as e:
+                # Pillow raises a mix of types for a malformed TIFF header
+                raise ValueError(f"Corrupt JPEG Exif: {e}") from e
+            orientation = exif.get(0x0112)
+            if orientation and orientation != 1:
+                kept = Image.Exif()
+                kept[0x0112] = orientation
+                payload = kept.tobytes()
+                out.append(b"\xff\xe1" + (len(payload) + 2).to_bytes(2, "big") + payload)
+        pos = end
+    return b"".join(out)
+
+def _strip_png(data: bytes) -> bytes:
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("Not a PNG")
+    out, pos = [data[:8]], 8
+    while pos < len(data):
+        end = pos + 12 + int.from_bytes(data[pos:pos + 4], "big")
+        if end > len(data):
+            raise ValueError("Corrupt PNG chunk")
+        if data[pos + 4:pos + 8] not in PNG_METADATA_CHUNKS:
+            out.append(data[pos:end])
+        pos = end
+    return b"".join(out)
+
+def _strip_webp(data: bytes) -> bytes:
+    if data[:4] != b"RIFF" or data[8:12] != b"WEBP":
+        raise ValueError("Not a WebP")
+    chunks, pos = [], 12
+    while pos < len(data):
+        size = int.from_bytes(data[pos + 4:pos + 8], "little")
+        if pos + 8 + size > len(data):
+            raise ValueError("Corrupt WebP chunk")
+        end = pos + 8 + size + (size & 1)
+        fourcc, chunk = data[pos:pos + 4], data[pos:end]
+        if fourcc == b"VP8X":
+            if size < 1:
+                raise ValueError("Corrupt WebP chunk")
+            # Clear the EXIF and XMP present flags
+            chunk = chunk[:8] + bytes([chunk[8] & ~0x0C]) + chunk[9:]
+        if fourcc not in WEBP_METADATA_CHUNKS:
+            chunks.append(chunk)
+        pos = end
+    body = b"WEBP" + b"".join(chunks)
+    return b"RIFF" + len(body).to_bytes(4, "little") + body
+
+METADATA_STRIPPERS = {"image/jpeg": _strip_jpeg, "image/png": _strip_png, "image/webp": _strip_webp}
+
+def strip_image_metadata(path: Path, content_type: str) -> tuple:
+    # Rewrites the file in place when anything was removed; returns the
+    # final (sha256, size)
+    data = path.read_bytes()
+    stripped = METADATA_STRIPPERS[content_type](data)
+    if stripped != data:
+        path.write_bytes(stripped)
+    return hashlib.sha256(stripped).hexdigest(), len(stripped)
+
+async def _generate_derivatives(url: str, source: Path):
+    thumbnail_name = f"{source.stem}_thumb.jpg"
+    webp_name = f"{source.stem}.webp"
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        await loop.run_in_executor(
+            image_pool,
+            build_image_derivatives,
+            str(source),
+            str(DERIVATIVE_DIR / thumbnail_name),
+            str(DERIVATIVE_DIR / webp_name)
+        )
+    except Exception as e:
+        logger.warning(f"Could not build derivatives for {url}: {e}")
+        await db.upload_derivatives.update_one({"url": url}, {"$set": {"status": "failed"}})
+        return
+    await db.upload_derivatives.update_one({"url": url}, {"$set": {
+        "status": "ready",
+        "thumbnail_url": f"/uploads/derivatives/{thumbnail_name}",
+        "webp_url": f"/uploads/derivatives/{webp_name}"
+    }})
+    logger.info(f"Built derivatives for {url} in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+async def schedule_image_derivatives(url: str, source: Path):
+    await db.upload_derivatives.update_one(
+        {"url": url},
+        {"$set": {"url": url, "status": "pending", "created_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    task = asyncio.create_task(_generate_derivatives(url, source))
+    _derivative_tasks.add(task)
+    task.add_done_callback(_derivative_tasks.discard)
+
+async def apply_image_variant(docs: List[dict], variant: Optional[str]) -> List[dict]:
+    if not variant:
+        return docs
+    if variant not in IMAGE_VARIANTS:
+        raise HTTPException(status_code=400, detail="image_variant must be thumbnail or webp")
     
-    tests = await db.drug_tests.find(query, {"_id": 0}).sort("test_date", -1).to_list(1000)
-    return tests
+    urls = [doc["image_url"] for doc in docs if doc.get("image_url")]
+    if not urls:
+        return docs
+    field = IMAGE_VARIANTS[variant]
+    derivatives = {}
+    async for entry in db.upload_derivatives.find({"url": {"$in": urls}, "status": "ready"}, {"_id": 0}):
+        derivatives[entry["url"]] = entry[field]
+    for doc in docs:
+        if doc.get("image_url") in derivatives:
+            doc["image_url"] = derivatives[doc["image_url"]]
+    return docs
 
-# Meetings
-@api_router.post("/meetings", response_model=Meeting)
-async def create_meeting(
-    data: MeetingCreate,
+@api_router.post("/upload")
+async def upload_file(
+    file: UploadFile = File(...),
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    if file.content_type not in UPLOAD_ALLOWED_TYPES:
+        upload_metrics.rejected += 1
+        raise HTTPException(status_code=415, detail=f"Unsupported file type: {file.content_type}")
+    
+    # Save file
+    started = time.perf_counter()
+    try:
+        partial_path, content_hash, size = await save_upload(file)
+    except HTTPException:
+        upload_metrics.rejected += 1
+        raise
+    if file.content_type in METADATA_STRIPPERS:
+        try:
+            content_hash, size = await asyncio.to_thread(strip_image_metadata, partial_path, file.content_type)
+        except ValueError as e:
+            await asyncio.to_thread(partial_path.unlink, True)
+            upload_metrics.rejected += 1
+            raise HTTPException(status_code=415, detail=f"Could not read image: {e}")
+        except BaseException:
+            # Still a 500, but the partial file does not outlive the request
+            partial_path.unlink(missing_ok=True)
+            raise
+    
+    # Content-addressed: identical bytes share one file and one uploads entry
+    existing = await db.uploads.find_one({"hash": content_hash}, {"_id": 0, "url": 1})
+    if existing:
+        await asyncio.to_thread(partial_path.unlink, True)
+        url = existing["url"]
+    else:
+        relative_path = content_path(content_hash, UPLOAD_TYPES[file.content_type][0])
+        await asyncio.to_thread(_store_content, partial_path, UPLOAD_DIR / relative_path)
+        url = f"/uploads/{relative_path.as_posix()}"
+        await db.uploads.update_one(
+            {"hash": content_hash},
+            {
+                "$setOnInsert": {
+                    "hash": content_hash,
+                    "url": url,
+                    "size": size,
+                    "content_type": file.content_type,
+                    "created_at": datetime.now(timezone.utc)
+                }
+            },
+            upsert=True
+        )
+        if file.content_type in IMAGE_DERIVATIVE_TYPES:
+            await schedule_image_derivatives(url, UPLOAD_DIR / relative_path)
+    
+    elapsed = time.perf_counter() - started
+    upload_metrics.record(size, elapsed)
+    logger.info(f"Stored upload {content_hash} ({size} bytes, {'deduplicated' if existing else 'new'}) in {elapsed * 1000:.1f} ms")
+    
+    # Return URL
+    return {"url": url}
+
+@api_router.get("/admin/upload-metrics")
+async def get_upload_metrics(
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user or user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return upload_metrics.stats()
+
+# Resident stats: per-resident compliance rollups in resident_stats, updated
+# incrementally by the write endpoints so reads are a single document fetch
+def _month_key(value) -> str:
+    return as_utc(value).strftime("%Y-%m")
+
+async def record_drug_test_stats(doc: dict):
+    test_date = doc["test_date"]
+    in_order = {"$gte": [test_date, {"$ifNull": ["$last_test_date", test_date]}]}
+    streak = {"$ifNull": ["$negative_test_streak", 0]}
+    stats = {
+        "user_id": doc["user_id"],
+        "drug_tests_total": {"$add": [{"$ifNull": ["$drug_tests_total", 0]}, 1]},
+        "negative_test_streak": {"$cond": [
+            in_order,
+            {"$add": [streak, 1]} if doc["result"] == "negative" else 0,
+            streak
+        ]},
+        "last_test_date": {"$cond": [in_order, test_date, "$last_test_date"]},
+        "updated_at": datetime.now(timezone.utc)
+    }
+    if doc["result"] == "positive":
+        stats["last_positive_date"] = {"$max": ["$last_positive_date", test_date]}
+    
+    before = await db.resident_stats.find_one_and_update(
+        {"user_id": doc["user_id"]},
+        [{"$set": stats}],
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+    # A backdated test can break the streak; recount this resident instead
+    if before and before.get("last_test_date") and as_utc(test_date) < as_utc(before["last_test_date"]):
+        await rebuild_resident_stats(doc["user_id"])
+
+async def record_meeting_stats(doc: dict):
+    await db.resident_stats.update_one(
+        {"user_id": doc["user_id"]},
+        {
+            "$inc": {"meetings_total": 1, "meetings_attended": 1 if doc["attended"] else 0},
+            "$set": {"updated_at": datetime.now(timezone.utc)}
+        },
+        upsert=True
+    )
+
+async def record_meetings_stats(docs: List[dict]):
+    # Roll call: one bulk write with a single increment per resident
+    totals = {}
+    for doc in docs:
+        entry = totals.setdefault(doc["user_id"], [0, 0])
+        entry[0] += 1
+        entry[1] += 1 if doc["attended"] else 0
+    if not totals:
+        return
+    now = datetime.now(timezone.utc)
+    await db.resident_stats.bulk_write([
+        UpdateOne(
+            {"user_id": user_id},
+            {"$inc": {"meetings_total": total, "meetings_attended": attended}, "$set": {"updated_at": now}},
+            upsert=True
+        )
+        for user_id, (total, attended) in totals.items()
+    ], ordered=False)
+
+async def record_rent_payment_stats(doc: dict):
+    await db.resident_stats.update_one(
+        {"user_id": doc["user_id"]},
+        {
+            "$inc": {"rent_payments_total": 1},
+            "$set": {"updated_at": datetime.now(timezone.utc)}
+        },
+        upsert=True
+    )
+
+async def record_rent_confirmation_stats(before: dict, confirmed: bool):
+    if bool(before.get("confirmed")) == confirmed:
+        return
+    amount = before["amount"] if confirmed else -before["amount"]
+    await db.resident_stats.update_one(
+        {"user_id": before["user_id"]},
+        {
+            "$inc": {
+                "rent_paid_total": amount,
+                f"rent_paid_by_month.{_month_key(before['payment_date'])}": amount
+            },
+            "$set": {"updated_at": datetime.now(timezone.utc)}
+        },
+        upsert=True
+    )
+
+async def rebuild_resident_stats(user_id: Optional[str] = None) -> int:
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_ids = set()
+        for collection in ("drug_tests", "meetings", "rent_payments"):
+            user_ids.update(await db[collection].distinct("user_id"))
+    
+    for resident_id in user_ids:
+        stats = {
+            "user_id": resident_id,
+            "drug_tests_total": 0,
+            "negative_test_streak": 0,
+            "last_test_date": None,
+            "last_positive_date": None,
+            "meetings_total": 0,
+            "meetings_attended": 0,
+            "rent_payments_total": 0,
+            "rent_paid_total": 0.0,
+            "rent_paid_by_month": {},
+            "updated_at": datetime.now(timezone.utc)
+        }
+        streak_open = True
+        tests = db.drug_tests.find({"user_id": resident_id}, {"_id": 0, "test_date": 1, "result": 1}).sort("test_date", -1)
+        async for test in tests:
+            stats["drug_tests_total"] += 1
+            if stats["last_test_date"] is None:
+                stats["last_test_date"] = test["test_date"]
+            if streak_open and test["result"] == "negative":
+                stats["negative_test_streak"] += 1
+            else:
+                streak_open = False
+            if test["result"] == "positive" and stats["last_positive_date"] is None:
+                stats["last_positive_date"] = test["test_date"]
+        
+        stats["meetings_total"] = await db.meetings.count_documents({"user_id": resident_id})
+        stats["meetings_attended"] = await db.meetings.count_documents({"user_id": resident_id, "attended": True})
+        
+        payments = db.rent_payments.find({"user_id": resident_id}, {"_id": 0, "payment_date": 1, "amount": 1, "confirmed": 1})
+        async for payment in payments:
+            stats["rent_payments_total"] += 1
+            if payment.get("confirmed"):
+                month = _month_key(payment["payment_date"])
+                stats["rent_paid_total"] += payment["amount"]
+                stats["rent_paid_by_month"][month] = stats["rent_paid_by_month"].get(month, 0) + payment["amount"]
+        
+        await db.resident_stats.replace_one({"user_id": resident_id}, stats, upsert=True)
+    return len(user_ids)
+
+def _resident_summary(stats: dict, expected_rent: float) -> dict:
+    paid_this_month = stats.get("rent_paid_by_month", {}).get(_month_key(datetime.now(timezone.utc)), 0)
+    meetings_total = stats.get("meetings_total", 0)
+    return {
+        "user_id": stats["user_id"],
+        "drug_tests_total": stats.get("drug_tests_total", 0),
+        "negative_test_streak": stats.get("negative_test_streak", 0),
+        "last_test_date": stats.get("last_test_date"),
+        "last_positive_date": stats.get("last_positive_date"),
+        "meetings_total": meetings_total,
+        "meetings_attended": stats.get("meetings_attended", 0),
+        "attendance_rate": stats.get("meetings_attended", 0) / meetings_total if meetings_total else None,
+        "rent_payments_total": stats.get("rent_payments_total", 0),
+        "rent_paid_total": stats.get("rent_paid_total", 0),
+        "rent_paid_this_month": paid_this_month,
+        "expected_rent_amount": expected_rent,
+        "rent_balance_this_month": expected_rent - paid_this_month,
+        "updated_at": stats.get("updated_at")
+    }
+
+async def _expected_rent() -> float:
+    settings = await cached_admin_settings()
+    return settings.get("expected_rent_amount", 0.0) if settings else 0.0
+
+@api_router.get("/resident-stats")
+async def list_resident_stats(
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user or user.role not in ["admin", "mentor"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    expected_rent = await _expected_rent()
+    # user_id is unique here, so it pages on its own
+    stats = await paginate(response, db.resident_stats, {}, "user_id", ASCENDING, limit, cursor, tiebreak="user_id")
+    return [_resident_summary(entry, expected_rent) for entry in stats]
+
+@api_router.get("/resident-stats/{user_id}")
+async def get_resident_stats(
+    user_id: str,
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if user.role == "user" and user_id != user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    stats = await db.resident_stats.find_one({"user_id": user_id}, {"_id": 0}) or {"user_id": user_id}
+    return _resident_summary(stats, await _expected_rent())
+
+@api_router.post("/admin/resident-stats/rebuild")
+async def rebuild_resident_stats_endpoint(
+    user_id: Optional[str] = None,
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user or user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    rebuilt = await rebuild_resident_stats(user_id)
+    return {"message": "Resident stats rebuilt", "residents": rebuilt}
+
+# Batch create: every item is validated on its own so one bad row does not
+# sink a whole testing day or roll call, then all valid rows are written
+# with a single unordered insert_many
+BATCH_MAX_ITEMS = 500
+
+async def batch_insert(collection, items: List[dict], create_model, build) -> tuple:
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            obj, doc = build(create_model(**item))
+        except (ValueError, TypeError) as e:
+            results[index] = {"index": index, "status": "error", "detail": str(e)}
+            continue
+        valid.append((index, obj, doc))
+    
+    write_errors = {}
+    if valid:
+        try:
+            await collection.insert_many([doc for _, _, doc in valid], ordered=False)
+        except BulkWriteError as e:
+            write_errors = {err["index"]: err["errmsg"] for err in e.details["writeErrors"]}
+    
+    inserted = []
+    for position, (index, obj, doc) in enumerate(valid):
+        if position in write_errors:
+            results[index] = {"index": index, "status": "error", "detail": write_errors[position]}
+        else:
+            results[index] = {"index": index, "status": "created", "id": obj.id}
+            inserted.append(doc)
+    return {"created": len(inserted), "failed": len(items) - len(inserted), "results": results}, inserted
+
+# Drug tests
+def build_drug_test(data: DrugTestCreate) -> tuple:
+    test_dict = data.model_dump()
+    test_dict["test_date"] = datetime.fromisoformat(test_dict["test_date"])
+    test_obj = DrugTest(**test_dict)
+    doc = test_obj.model_dump()
+    return test_obj, doc
+
+@api_router.post("/drug-tests", response_model=DrugTest)
+async def create_drug_test(
+    data: DrugTestCreate,
     session_token: Optional[str] = Cookie(None),
     authorization: Optional[str] = Header(None)
 ):
@@ -441,18 +2270,110 @@ async def create_meeting(
     if not user or user.role not in ["admin", "mentor"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    test_obj, doc = build_drug_test(data)
+    await db.drug_tests.insert_one(doc)
+    await record_drug_test_stats(doc)
+    return test_obj
+
+@api_router.post("/drug-tests/batch")
+async def create_drug_tests_batch(
+    items: List[dict],
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user or user.role not in ["admin", "mentor"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    summary, inserted = await batch_insert(db.drug_tests, items, DrugTestCreate, build_drug_test)
+    
+    # Streaks depend on order, so each resident's tests are applied oldest
+    # first; different residents are updated concurrently
+    by_resident = {}
+    for doc in inserted:
+        by_resident.setdefault(doc["user_id"], []).append(doc)
+    
+    async def record_resident(docs: List[dict]):
+        docs = sorted(docs, key=lambda d: as_utc(d["test_date"]))
+        # The whole batch is already stored, so a rebuild triggered by a
+        # backdated item would count the later items too; rebuild once
+        # instead of applying any of them
+        current = await db.resident_stats.find_one({"user_id": docs[0]["user_id"]}, {"_id": 0, "last_test_date": 1})
+        if current and current.get("last_test_date") and as_utc(docs[0]["test_date"]) < as_utc(current["last_test_date"]):
+            await rebuild_resident_stats(docs[0]["user_id"])
+            return
+        for doc in docs:
+            await record_drug_test_stats(doc)
+    
+    await asyncio.gather(*(record_resident(docs) for docs in by_resident.values()))
+    return summary
+
+@api_router.get("/drug-tests", response_model=List[DrugTest])
+async def get_drug_tests(
+    response: Response,
+    user_id: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    image_variant: Optional[str] = None,
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    query = {}
+    if user.role == "user":
+        query["user_id"] = user.id
+    elif user_id:
+        query["user_id"] = user_id
+    
+    docs = await paginate(response, db.drug_tests, query, "test_date", DESCENDING, limit, cursor, model_projection(DrugTest))
+    return list_response(response, await apply_image_variant(docs, image_variant), DrugTest)
+
+# Meetings
+def build_meeting(data: MeetingCreate) -> tuple:
     meeting_dict = data.model_dump()
-    meeting_dict["meeting_date"] = datetime.fromisoformat(meeting_dict["meeting_date"]).isoformat()
+    meeting_dict["meeting_date"] = datetime.fromisoformat(meeting_dict["meeting_date"])
     meeting_obj = Meeting(**meeting_dict)
     doc = meeting_obj.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
+    return meeting_obj, doc
+
+@api_router.post("/meetings", response_model=Meeting)
+async def create_meeting(
+    data: MeetingCreate,
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user or user.role not in ["admin", "mentor"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
     
+    meeting_obj, doc = build_meeting(data)
     await db.meetings.insert_one(doc)
+    await record_meeting_stats(doc)
     return meeting_obj
 
+@api_router.post("/meetings/batch")
+async def create_meetings_batch(
+    items: List[dict],
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user or user.role not in ["admin", "mentor"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    summary, inserted = await batch_insert(db.meetings, items, MeetingCreate, build_meeting)
+    await record_meetings_stats(inserted)
+    return summary
+
 @api_router.get("/meetings", response_model=List[Meeting])
 async def get_meetings(
+    response: Response,
     user_id: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
     session_token: Optional[str] = Cookie(None),
     authorization: Optional[str] = Header(None)
 ):
@@ -466,8 +2387,8 @@ async def get_meetings(
     elif user_id:
         query["user_id"] = user_id
     
-    meetings = await db.meetings.find(query, {"_id": 0}).sort("meeting_date", -1).to_list(1000)
-    return meetings
+    docs = await paginate(response, db.meetings, query, "meeting_date", DESCENDING, limit, cursor, model_projection(Meeting))
+    return list_response(response, docs, Meeting)
 
 # Rent payments
 @api_router.post("/rent-payments", response_model=RentPayment)
@@ -481,19 +2402,23 @@ async def create_rent_payment(
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     payment_dict = data.model_dump()
-    payment_dict["payment_date"] = datetime.fromisoformat(payment_dict["payment_date"]).isoformat()
+    payment_dict["payment_date"] = datetime.fromisoformat(payment_dict["payment_date"])
     payment_dict["confirmed"] = False
     payment_obj = RentPayment(**payment_dict)
     doc = payment_obj.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
     doc["payment_date"] = doc["payment_date"]
     
     await db.rent_payments.insert_one(doc)
+    await record_rent_payment_stats(doc)
     return payment_obj
 
 @api_router.get("/rent-payments", response_model=List[RentPayment])
 async def get_rent_payments(
+    response: Response,
     user_id: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    image_variant: Optional[str] = None,
     session_token: Optional[str] = Cookie(None),
     authorization: Optional[str] = Header(None)
 ):
@@ -507,8 +2432,8 @@ async def get_rent_payments(
     elif user_id:
         query["user_id"] = user_id
     
-    payments = await db.rent_payments.find(query, {"_id": 0}).sort("payment_date", -1).to_list(1000)
-    return payments
+    docs = await paginate(response, db.rent_payments, query, "payment_date", DESCENDING, limit, cursor, model_projection(RentPayment))
+    return list_response(response, await apply_image_variant(docs, image_variant), RentPayment)
 
 @api_router.patch("/rent-payments/{payment_id}/confirm")
 async def confirm_rent_payment(
@@ -524,10 +2449,17 @@ async def confirm_rent_payment(
     update_data = {
         "confirmed": data.confirmed,
         "confirmed_by": data.confirmed_by,
-        "confirmation_date": datetime.now(timezone.utc).isoformat()
+        "confirmation_date": datetime.now(timezone.utc)
     }
     
-    await db.rent_payments.update_one({"id": payment_id}, {"$set": update_data})
+    before = await db.rent_payments.find_one_and_update(
+        {"id": payment_id},
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+    if before:
+        await record_rent_confirmation_stats(before, data.confirmed)
     return {"message": "Payment confirmed"}
 
 # Devotions
@@ -545,13 +2477,17 @@ async def create_devotion(
     devotion_dict["author_id"] = user.id
     devotion_obj = Devotion(**devotion_dict)
     doc = devotion_obj.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
     
     await db.devotions.insert_one(doc)
+    await bump_collection_version("devotions")
     return devotion_obj
 
 @api_router.get("/devotions", response_model=List[Devotion])
 async def get_devotions(
+    request: Request,
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
     session_token: Optional[str] = Cookie(None),
     authorization: Optional[str] = Header(None)
 ):
@@ -559,8 +2495,13 @@ async def get_devotions(
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    devotions = await db.devotions.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return devotions
+    version = await collection_version("devotions")
+    cached = not_modified(request, response, "devotions", version)
+    if cached:
+        return cached
+    
+    docs = await cached_page(response, "devotions", version, db.devotions, "created_at", limit, cursor, model_projection(Devotion))
+    return list_response(response, docs, Devotion)
 
 # Reading materials
 @api_router.post("/reading-materials", response_model=ReadingMaterial)
@@ -577,13 +2518,17 @@ async def create_reading_material(
     material_dict["added_by"] = user.id
     material_obj = ReadingMaterial(**material_dict)
     doc = material_obj.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
     
     await db.reading_materials.insert_one(doc)
+    await bump_collection_version("reading_materials")
     return material_obj
 
 @api_router.get("/reading-materials", response_model=List[ReadingMaterial])
 async def get_reading_materials(
+    request: Request,
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
     session_token: Optional[str] = Cookie(None),
     authorization: Optional[str] = Header(None)
 ):
@@ -591,8 +2536,122 @@ async def get_reading_materials(
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    materials = await db.reading_materials.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return materials
+    version = await collection_version("reading_materials")
+    cached = not_modified(request, response, "reading_materials", version)
+    if cached:
+        return cached
+    
+    docs = await cached_page(response, "reading_materials", version, db.reading_materials, "created_at", limit, cursor, model_projection(ReadingMaterial))
+    return list_response(response, docs, ReadingMaterial)
+
+# Message push: create_message publishes through the hub, which fans out to
+# the SSE streams of connected recipients. The backend decides how a
+# publication reaches other uvicorn workers.
+class LocalHubBackend:
+    # Single worker: deliver straight to this process's subscribers
+    def __init__(self):
+        self.hub = None
+
+    async def start(self, hub):
+        self.hub = hub
+
+    async def stop(self):
+        pass
+
+    async def publish(self, message: dict):
+        self.hub.deliver(message)
+
+class MongoHubBackend:
+    # Multi-worker: every worker tails a capped collection, so a message
+    # written by any worker reaches subscribers on all of them
+    def __init__(self, collection_name: str = "message_events", size_bytes: int = 16 * 1024 * 1024):
+        self.collection_name = collection_name
+        self.size_bytes = size_bytes
+        self.hub = None
+        self._task = None
+
+    async def start(self, hub):
+        self.hub = hub
+        try:
+            await db.create_collection(self.collection_name, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            pass
+        self._task = asyncio.create_task(self._tail())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def publish(self, message: dict):
+        await db[self.collection_name].insert_one({"message": message})
+
+    async def _tail(self):
+        collection = db[self.collection_name]
+        latest = await collection.find_one({}, sort=[("$natural", -1)])
+        last_id = latest["_id"] if latest else None
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id else {}
+            cursor = collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                while cursor.alive:
+                    async for event in cursor:
+                        last_id = event["_id"]
+                        self.hub.deliver(event["message"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Message hub tail interrupted: {e}")
+            await asyncio.sleep(1)
+
+class MessageHub:
+    def __init__(self, backend, queue_size: int = 100):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscribers: dict = {}
+
+    async def start(self):
+        await self.backend.start(self)
+
+    async def stop(self):
+        await self.backend.stop()
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    async def publish(self, message: dict):
+        await self.backend.publish(message)
+
+    def deliver(self, message: dict):
+        if message.get("recipient_id") is None:
+            targets = list(self._subscribers)
+        else:
+            targets = {message["sender_id"], message["recipient_id"]}
+        for user_id in targets:
+            for queue in self._subscribers.get(user_id, ()):
+                try:
+                    queue.put_nowait(message)
+                except asyncio.QueueFull:
+                    # Slow consumer; it re-syncs via GET /messages on reconnect
+                    pass
+
+    def connection_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+MESSAGE_HUB_BACKENDS = {
+    "local": LocalHubBackend,
+    "mongo": MongoHubBackend,
+}
+message_hub = MessageHub(MESSAGE_HUB_BACKENDS[os.environ.get('MESSAGE_HUB_BACKEND', 'local')]())
+SSE_KEEPALIVE_SECONDS = 15
 
 # Messages
 @api_router.post("/messages", response_model=Message)
@@ -609,13 +2668,47 @@ async def create_message(
     message_dict["sender_id"] = user.id
     message_obj = Message(**message_dict)
     doc = message_obj.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
     
     await db.messages.insert_one(doc)
+    await message_hub.publish(message_obj.model_dump(mode="json"))
     return message_obj
 
+@api_router.get("/messages/stream")
+async def stream_messages(
+    request: Request,
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    queue = message_hub.subscribe(user.id)
+    
+    async def events():
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: message\nid: {message['id']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            message_hub.unsubscribe(user.id, queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.get("/messages", response_model=List[Message])
 async def get_messages(
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
     session_token: Optional[str] = Cookie(None),
     authorization: Optional[str] = Header(None)
 ):
@@ -624,15 +2717,15 @@ async def get_messages(
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     # Get messages where user is sender or recipient (or broadcast)
-    messages = await db.messages.find({
+    query = {
         "$or": [
             {"sender_id": user.id},
             {"recipient_id": user.id},
             {"recipient_id": None}
         ]
-    }, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    
-    return messages
+    }
+    docs = await paginate(response, db.messages, query, "created_at", DESCENDING, limit, cursor, model_projection(Message))
+    return list_response(response, docs, Message)
 
 @api_router.patch("/messages/{message_id}/read")
 async def mark_message_read(
@@ -647,6 +2740,133 @@ async def mark_message_read(
     await db.messages.update_one({"id": message_id}, {"$set": {"read": True}})
     return {"message": "Marked as read"}
 
+# Search: each searchable collection has one weighted text index; results
+# from all of them are merged by textScore and paged on (score, type, id).
+# Highlights are HTML-escaped snippets with matches wrapped in <mark>.
+SEARCH_TYPES = {
+    "devotions": ["title", "scripture_reference", "content"],
+    "reading_materials": ["title", "author", "category", "description"],
+    "messages": ["content"],
+}
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_MAX_QUERY = 200
+SEARCH_SNIPPET_CHARS = 160
+
+SEARCH_SUFFIXES = ("ing", "ed", "es", "s", "e")
+
+def _search_stem(word: str) -> str:
+    # Mongo matches on stems, so "hoping" finds "hope"; trimming a common
+    # suffix and marking by word prefix gets the highlight close enough
+    for suffix in SEARCH_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+def _search_pattern(q: str) -> Optional[re.Pattern]:
+    # Negated terms are excluded by Mongo, so there is nothing to mark
+    terms = {_search_stem(word.lower()) for word in re.findall(r"-?\w+", q) if not word.startswith("-")}
+    if not terms:
+        return None
+    alternatives = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternatives})\w*", re.IGNORECASE)
+
+def highlight(text: str, pattern: re.Pattern) -> Optional[str]:
+    first = pattern.search(text)
+    if not first:
+        return None
+    start = max(0, first.start() - SEARCH_SNIPPET_CHARS // 4)
+    end = min(len(text), start + SEARCH_SNIPPET_CHARS)
+    snippet = text[start:end]
+    
+    parts, position = [], 0
+    for match in pattern.finditer(snippet):
+        parts.append(html.escape(snippet[position:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group())}</mark>")
+        position = match.end()
+    parts.append(html.escape(snippet[position:]))
+    return ("\u2026" if start else "") + "".join(parts) + ("\u2026" if end < len(text) else "")
+
+def _after_search_cursor(search_type: str, cursor: Optional[tuple]) -> List[dict]:
+    # Results sort by score descending, then type and id ascending
+    if not cursor:
+        return []
+    score, last_type, last_id = cursor
+    if search_type > last_type:
+        return [{"$match": {"_score": {"$lte": score}}}]
+    if search_type < last_type:
+        return [{"$match": {"_score": {"$lt": score}}}]
+    return [{"$match": {"$or": [{"_score": {"$lt": score}}, {"_score": score, "id": {"$gt": last_id}}]}}]
+
+async def _search_collection(search_type: str, q: str, visibility: dict, cursor: Optional[tuple], limit: int) -> List[dict]:
+    pipeline = [
+        {"$match": {"$text": {"$search": q}, **visibility}},
+        {"$set": {"_score": {"$meta": "textScore"}}},
+        *_after_search_cursor(search_type, cursor),
+        {"$sort": {"_score": -1, "id": 1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0}}
+    ]
+    docs = await db[search_type].aggregate(pipeline).to_list(limit)
+    return [{"type": search_type, **doc} for doc in docs]
+
+@api_router.get("/search")
+async def search(
+    response: Response,
+    q: str,
+    types: Optional[str] = None,
+    limit: int = SEARCH_DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    q = q.strip()
+    if not q or len(q) > SEARCH_MAX_QUERY:
+        raise HTTPException(status_code=400, detail=f"Query must be 1-{SEARCH_MAX_QUERY} characters")
+    search_types = types.split(",") if types else list(SEARCH_TYPES)
+    if any(search_type not in SEARCH_TYPES for search_type in search_types):
+        raise HTTPException(status_code=400, detail=f"types must be among {', '.join(SEARCH_TYPES)}")
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    
+    after = None
+    if cursor:
+        try:
+            after = tuple(json.loads(_b64decode(cursor)))
+            score, last_type, last_id = after
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    visibility = {
+        "messages": {"$or": [{"sender_id": user.id}, {"recipient_id": user.id}, {"recipient_id": None}]}
+    }
+    batches = await asyncio.gather(*(
+        _search_collection(search_type, q, visibility.get(search_type, {}), after, limit + 1)
+        for search_type in search_types
+    ))
+    docs = sorted((doc for batch in batches for doc in batch), key=lambda d: (-d["_score"], d["type"], d["id"]))
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        response.headers[NEXT_CURSOR_HEADER] = _b64encode(json.dumps([last["_score"], last["type"], last["id"]]).encode())
+    
+    pattern = _search_pattern(q)
+    results = []
+    for doc in docs:
+        search_type, score = doc.pop("type"), doc.pop("_score")
+        highlights = {}
+        if pattern:
+            for field in SEARCH_TYPES[search_type]:
+                if isinstance(doc.get(field), str):
+                    snippet = highlight(doc[field], pattern)
+                    if snippet:
+                        highlights[field] = snippet
+        results.append({"type": search_type, "id": doc["id"], "score": score, "document": doc, "highlights": highlights})
+    return results
+
 # Admin settings
 @api_router.get("/admin/settings")
 async def get_admin_settings(
@@ -657,16 +2877,18 @@ async def get_admin_settings(
     if not user or user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
     
-    settings = await db.admin_settings.find_one({})
+    settings = await cached_admin_settings()
     if not settings:
         # Create default settings
         default_settings = {
             "id": str(uuid.uuid4()),
             "expected_rent_amount": 0.0,
             "rent_due_day": 1,
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "updated_at": datetime.now(timezone.utc)
         }
-        await db.admin_settings.insert_one(default_settings)
+        # insert_one adds _id to the dict it is given
+        await db.admin_settings.insert_one(dict(default_settings))
+        reference_cache.invalidate("admin_settings")
         return default_settings
     return settings
 
@@ -681,9 +2903,10 @@ async def update_admin_settings(
         raise HTTPException(status_code=403, detail="Admin only")
     
     update_data = {k: v for k, v in data.model_dump().items() if v is not None}
-    update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+    update_data["updated_at"] = datetime.now(timezone.utc)
     
     await db.admin_settings.update_one({}, {"$set": update_data}, upsert=True)
+    reference_cache.invalidate("admin_settings")
     return {"message": "Settings updated"}
 
 # Devotion links
@@ -701,13 +2924,15 @@ async def create_devotion_link(
     link_dict["added_by"] = user.id
     link_obj = DevotionLink(**link_dict)
     doc = link_obj.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
     
     await db.devotion_links.insert_one(doc)
+    await bump_collection_version("devotion_links")
     return link_obj
 
 @api_router.get("/devotion-links")
 async def get_devotion_links(
+    request: Request,
+    response: Response,
     session_token: Optional[str] = Cookie(None),
     authorization: Optional[str] = Header(None)
 ):
@@ -715,8 +2940,14 @@ async def get_devotion_links(
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    links = await db.devotion_links.find({}, {"_id": 0}).to_list(1000)
-    return links
+    version = await collection_version("devotion_links")
+    cached = not_modified(request, response, "devotion_links", version)
+    if cached:
+        return cached
+    
+    async def load():
+        return await db.devotion_links.find({}, {"_id": 0}).to_list(1000)
+    return await reference_cache.get(("devotion_links", version["version"]), load)
 
 # Event requests
 @api_router.post("/event-requests")
@@ -734,13 +2965,15 @@ async def create_event_request(
     request_dict["status"] = "pending"
     request_obj = EventRequest(**request_dict)
     doc = request_obj.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
     
     await db.event_requests.insert_one(doc)
     return request_obj
 
 @api_router.get("/event-requests")
 async def get_event_requests(
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
     session_token: Optional[str] = Cookie(None),
     authorization: Optional[str] = Header(None)
 ):
@@ -748,8 +2981,20 @@ async def get_event_requests(
     if not user or user.role not in ["admin", "mentor"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    requests = await db.event_requests.find({}, {"_id": 0}).to_list(1000)
-    return requests
+    return await paginate(response, db.event_requests, {}, "created_at", DESCENDING, limit, cursor)
+
+def build_event_from_request(request: dict, approver_id: str) -> dict:
+    event_dict = {
+        "title": request["title"],
+        "description": request.get("description"),
+        "event_date": request["event_date"],
+        "event_type": request["event_type"],
+        "location": request.get("location"),
+        "created_by": approver_id
+    }
+    event_obj = CalendarEvent(**event_dict)
+    doc = event_obj.model_dump()
+    return doc
 
 @api_router.patch("/event-requests/{request_id}/approve")
 async def approve_event_request(
@@ -761,33 +3006,295 @@ async def approve_event_request(
     if not user or user.role not in ["admin", "mentor"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    request = await db.event_requests.find_one({"id": request_id})
-    if not request:
+    # Build the event first, so a request that cannot become one is
+    # refused without ever being claimed
+    pending = await db.event_requests.find_one({"id": request_id}, {"_id": 0})
+    if not pending:
         raise HTTPException(status_code=404, detail="Request not found")
+    if pending.get("status") != "pending":
+        raise HTTPException(status_code=409, detail="Request is not pending")
+    try:
+        event_doc = build_event_from_request(pending, user.id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Request cannot become an event: {e}")
+    
+    # Claim the request: only one approver can move it out of pending
+    event_id = event_doc["id"]
+    claim = await db.event_requests.update_one(
+        {"id": request_id, "status": "pending"},
+        {"$set": {
+            "status": "approved",
+            "approved_by": user.id,
+            "approved_at": datetime.now(timezone.utc),
+            "event_id": event_id
+        }}
+    )
+    if claim.modified_count == 0:
+        # Another approver claimed it since the read above
+        raise HTTPException(status_code=409, detail="Request is not pending")
     
     # Create calendar event
-    event_dict = {
-        "title": request["title"],
-        "description": request.get("description"),
-        "event_date": request["event_date"],
-        "event_type": request["event_type"],
-        "location": request.get("location"),
-        "created_by": user.id
-    }
-    event_obj = CalendarEvent(**event_dict)
-    doc = event_obj.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
-    await db.calendar_events.insert_one(doc)
+    try:
+        await db.calendar_events.insert_one(event_doc)
+    except Exception:
+        # Release the claim so the request can be approved again
+        await db.event_requests.update_one(
+            {"id": request_id, "event_id": event_id},
+            {"$set": {"status": "pending"}, "$unset": {"approved_by": "", "approved_at": "", "event_id": ""}}
+        )
+        raise
+    await bump_collection_version("calendar_events")
     
-    # Update request status
-    await db.event_requests.update_one(
-        {"id": request_id},
-        {"$set": {"status": "approved"}}
+    return {"message": "Request approved and event created", "event_id": event_id}
+
+async def release_approval_claims(request_ids: List[str], batch_id: str):
+    # Put claimed requests back to pending so they can be approved again
+    await db.event_requests.update_many(
+        {"id": {"$in": request_ids}, "approval_batch": batch_id},
+        {"$set": {"status": "pending"}, "$unset": {"approved_by": "", "approved_at": "", "approval_batch": ""}}
     )
+
+@api_router.post("/event-requests/approve")
+async def approve_event_requests_bulk(
+    data: EventRequestBulkApprove,
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user or user.role not in ["admin", "mentor"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if len(data.request_ids) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} requests per call")
+    
+    # Events are built from the pending requests before anything is claimed,
+    # so a request that cannot become an event is reported and left pending
+    errors = {}
+    events = {}
+    async for request in db.event_requests.find({"id": {"$in": data.request_ids}, "status": "pending"}, {"_id": 0}):
+        try:
+            events[request["id"]] = build_event_from_request(request, user.id)
+        except (ValueError, TypeError) as e:
+            errors[request["id"]] = str(e)
     
-    return {"message": "Request approved and event created"}
+    # One update_many claims every still-pending request for this batch;
+    # each document flips atomically, so concurrent approvers never both win
+    batch_id = str(uuid.uuid4())
+    if events:
+        await db.event_requests.update_many(
+            {"id": {"$in": list(events)}, "status": "pending"},
+            {"$set": {
+                "status": "approved",
+                "approved_by": user.id,
+                "approved_at": datetime.now(timezone.utc),
+                "approval_batch": batch_id
+            }}
+        )
+    claimed = set(await db.event_requests.distinct("id", {"approval_batch": batch_id})) if events else set()
+    events = {request_id: event for request_id, event in events.items() if request_id in claimed}
+    
+    if events:
+        request_ids = list(events)
+        try:
+            await db.calendar_events.insert_many(list(events.values()), ordered=False)
+        except BulkWriteError as e:
+            for err in e.details["writeErrors"]:
+                errors[request_ids[err["index"]]] = err["errmsg"]
+        except Exception:
+            # The write may have landed in part; drop what did and release
+            # the whole batch, as the single approve does
+            await db.calendar_events.delete_many({"id": {"$in": [event["id"] for event in events.values()]}})
+            await release_approval_claims(request_ids, batch_id)
+            raise
+        failed = [request_id for request_id in request_ids if request_id in errors]
+        if failed:
+            await release_approval_claims(failed, batch_id)
+        approved = {request_id: event["id"] for request_id, event in events.items() if request_id not in errors}
+        if approved:
+            await db.event_requests.bulk_write([
+                UpdateOne({"id": request_id}, {"$set": {"event_id": event_id}})
+                for request_id, event_id in approved.items()
+            ], ordered=False)
+            await bump_collection_version("calendar_events")
+    else:
+        approved = {}
+    
+    existing = set()
+    missing = [request_id for request_id in data.request_ids if request_id not in approved and request_id not in errors]
+    if missing:
+        existing = set(await db.event_requests.distinct("id", {"id": {"$in": missing}}))
+    
+    results = []
+    for request_id in data.request_ids:
+        if request_id in approved:
+            results.append({"id": request_id, "status": "approved", "event_id": approved[request_id]})
+        elif request_id in errors:
+            results.append({"id": request_id, "status": "error", "detail": errors[request_id]})
+        elif request_id in existing:
+            results.append({"id": request_id, "status": "not_pending"})
+        else:
+            results.append({"id": request_id, "status": "not_found"})
+    return {"approved": len(approved), "failed": len(errors), "results": results}
+
+# Calendar events: a recurring event is stored once with an RRULE and
+# expanded into occurrences for the requested window at read time.
+# Cancelled occurrences live in exdates and edited ones in overrides, both
+# keyed by the occurrence's original start in naive UTC as %Y%m%dT%H%M%S,
+# which has no dots to split the overrides.<key> Mongo path on.
+RECURRENCE_FREQUENCIES = {"weekly": "WEEKLY", "monthly": "MONTHLY"}
+RRULE_FREQUENCIES = {"DAILY", "WEEKLY", "MONTHLY", "YEARLY"}
+RRULE_PARTS = {"FREQ", "INTERVAL", "COUNT", "UNTIL", "WKST", "BYDAY", "BYMONTHDAY", "BYYEARDAY", "BYWEEKNO", "BYMONTH", "BYSETPOS"}
+RECURRENCE_LOOKBACK = timedelta(days=31)
+RECURRENCE_HORIZON = timedelta(days=365)
+OCCURRENCE_FIELDS = ["title", "description", "event_date", "location", "leader"]
+OCCURRENCE_KEY_FORMAT = "%Y%m%dT%H%M%S"
+# The Gregorian calendar, weekdays included, repeats every 400 years
+RRULE_CYCLE_YEARS = 400
+
+def naive_utc(value) -> datetime:
+    # rrule and Mongo both work in naive UTC
+    return as_utc(value).astimezone(timezone.utc).replace(tzinfo=None)
+
+def occurrence_key(start: datetime) -> str:
+    return start.strftime(OCCURRENCE_KEY_FORMAT)
+
+def parse_rrule(value: str) -> str:
+    # Exactly one RRULE line. DTSTART comes from event_date and exceptions
+    # from the occurrences endpoint, so neither may ride along in the rule.
+    lines = [line.strip() for line in value.strip().splitlines() if line.strip()]
+    if len(lines) != 1:
+        raise HTTPException(status_code=400, detail="Recurrence must be a single RRULE line")
+    rule = lines[0].removeprefix("RRULE:")
+    parts = {}
+    for part in rule.split(";"):
+        name, sep, part_value = part.partition("=")
+        if not sep or name.upper() not in RRULE_PARTS or name.upper() in parts:
+            raise HTTPException(status_code=400, detail=f"Unsupported recurrence rule part: {name}")
+        parts[name.upper()] = part_value
+    if parts.get("FREQ", "").upper() not in RRULE_FREQUENCIES:
+        raise HTTPException(status_code=400, detail="Recurrence frequency must be DAILY, WEEKLY, MONTHLY or YEARLY")
+    # INTERVAL=0 makes dateutil repeat dtstart forever
+    for name in ("INTERVAL", "COUNT"):
+        if name in parts and not (parts[name].isdigit() and int(parts[name]) > 0):
+            raise HTTPException(status_code=400, detail=f"Recurrence {name} must be a positive whole number")
+    return rule
+
+@functools.lru_cache(maxsize=1024)
+def rrule_recurs(rule: str, dtstart: datetime) -> bool:
+    # dateutil walks every period up to year 9999 looking for a match, and
+    # neither until nor between() stops it early, so a rule whose BY* parts
+    # never line up (BYMONTH=2;BYMONTHDAY=30) costs seconds per expansion.
+    # The rule without COUNT/UNTIL is probed from dtstart moved on by whole
+    # calendar cycles to within two cycles of 9999, which bounds the walk
+    # while keeping its phase; a rule that matches nowhere in that span
+    # never matches at all.
+    parts = {}
+    for part in rule.split(";"):
+        name, _, value = part.partition("=")
+        parts[name.upper()] = value
+    cycle = RRULE_CYCLE_YEARS * max(1, int(parts.get("INTERVAL") or 1))
+    cycles = max(0, (datetime.max.year - dtstart.year) // cycle - 1)
+    probe_start = dtstart.replace(year=dtstart.year + cycles * cycle)
+    probe = ";".join(f"{name}={value}" for name, value in parts.items() if name not in ("COUNT", "UNTIL"))
+    return any(True for _ in rrulestr(probe, dtstart=probe_start).xafter(probe_start, count=1, inc=True))
+
+def build_rrule(data: CalendarEventCreate, dtstart: datetime) -> Optional[str]:
+    if data.rrule:
+        rule = parse_rrule(data.rrule)
+    elif data.is_recurring and data.recurrence_pattern in RECURRENCE_FREQUENCIES:
+        parts = [f"FREQ={RECURRENCE_FREQUENCIES[data.recurrence_pattern]}", f"INTERVAL={max(1, data.recurrence_interval)}"]
+        if data.recurrence_count:
+            parts.append(f"COUNT={data.recurrence_count}")
+        elif data.recurrence_until:
+            parts.append(f"UNTIL={naive_utc(data.recurrence_until):%Y%m%dT%H%M%S}")
+        rule = ";".join(parts)
+    else:
+        return None
+    # Expanding is the only check that catches rules rrulestr accepts but
+    # cannot iterate, such as a UTC UNTIL against the naive dtstart
+    try:
+        recurs = rrule_recurs(rule, dtstart) and any(
+            True for _ in rrulestr(rule, dtstart=dtstart).xafter(dtstart, count=1, inc=True)
+        )
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid recurrence rule: {e}")
+    if not recurs:
+        raise HTTPException(status_code=400, detail="Recurrence rule has no occurrences")
+    return rule
+
+def expand_series(master: dict, window_start: datetime, window_end: datetime, limit: int) -> List[dict]:
+    # window_end is exclusive, like the one-off range filter. Expansion
+    # stops at window_end or after limit occurrences, whichever comes first,
+    # so the caller starts each page's expansion at its cursor.
+    dtstart = naive_utc(master["event_date"])
+    if not rrule_recurs(master["rrule"], dtstart):
+        raise ValueError("rule has no occurrences")
+    rule = rrulestr(master["rrule"], dtstart=dtstart)
+    exdates = set(master.get("exdates") or [])
+    overrides = master.get("overrides") or {}
+    base = {k: v for k, v in master.items() if k not in ("exdates", "overrides")}
+    
+    occurrences = []
+    for start in rule.xafter(window_start, inc=True):
+        if start >= window_end or len(occurrences) >= limit:
+            break
+        # Series written before keys were normalised use the ISO form
+        key, legacy_key = occurrence_key(start), start.isoformat()
+        if key in exdates or legacy_key in exdates:
+            continue
+        occurrence = {**base, "id": f"{master['id']}:{legacy_key}", "series_id": master["id"], "event_date": start}
+        occurrence.update(overrides.get(key) or overrides.get(legacy_key) or {})
+        occurrences.append(occurrence)
+    return occurrences
+
+def _calendar_sort_key(doc: dict) -> tuple:
+    return (naive_utc(doc["event_date"]), doc["id"])
+
+async def calendar_window(
+    response: Response,
+    window_start: datetime,
+    window_end: datetime,
+    one_off_query: dict,
+    limit: int,
+    cursor: Optional[str]
+) -> List[dict]:
+    # Keyset-page the stored one-off events and merge in the expanded
+    # occurrences that sort after the cursor
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    one_offs = await keyset_page(
+        db.calendar_events,
+        {"$and": [{"rrule": None}, one_off_query]},
+        "event_date", ASCENDING, limit, cursor
+    )
+    
+    # Each series is expanded from the cursor on. The occurrence at the
+    # cursor itself may be the last row of the previous page, so one more
+    # than a page and a lookahead row is taken.
+    after = None
+    expand_from = window_start
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        after = (naive_utc(value), last_id)
+        expand_from = max(window_start, after[0])
+    
+    occurrences = []
+    async for master in db.calendar_events.find(
+        {"rrule": {"$ne": None}, **date_range_filter("event_date", None, window_end.isoformat())}, {"_id": 0}
+    ):
+        # Series stored before rules were validated on write may not expand;
+        # one bad series should not take the whole calendar down
+        try:
+            occurrences.extend(expand_series(master, expand_from, window_end, limit + 2))
+        except (ValueError, TypeError) as e:
+            logger.warning("Skipping calendar series %s: %s", master.get("id"), e)
+    if after:
+        occurrences = [o for o in occurrences if _calendar_sort_key(o) > after]
+    
+    events = sorted(one_offs + occurrences, key=_calendar_sort_key)
+    if len(events) > limit:
+        events = events[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(events[-1], "event_date")
+    return events
 
-# Calendar events
 @api_router.post("/calendar-events", response_model=CalendarEvent)
 async def create_calendar_event(
     data: CalendarEventCreate,
@@ -798,36 +3305,66 @@ async def create_calendar_event(
     if not user or user.role not in ["admin", "mentor"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    event_dict = data.model_dump()
-    event_dict["event_date"] = datetime.fromisoformat(event_dict["event_date"]).isoformat()
+    event_dict = data.model_dump(exclude={"recurrence_interval", "recurrence_count", "recurrence_until"})
+    event_dict["event_date"] = datetime.fromisoformat(event_dict["event_date"])
     event_dict["created_by"] = user.id
+    # Probing an odd rule can take a few hundred milliseconds of CPU
+    event_dict["rrule"] = await asyncio.to_thread(build_rrule, data, naive_utc(event_dict["event_date"]))
+    event_dict["is_recurring"] = event_dict["rrule"] is not None
     event_obj = CalendarEvent(**event_dict)
     doc = event_obj.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
     
     await db.calendar_events.insert_one(doc)
+    await bump_collection_version("calendar_events")
+    return event_obj
+
+@api_router.patch("/calendar-events/{event_id}/occurrences")
+async def update_occurrence(
+    event_id: str,
+    data: OccurrenceUpdate,
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user or user.role not in ["admin", "mentor"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Handle recurring events
-    if event_dict.get("is_recurring") and event_dict.get("recurrence_pattern"):
-        # Create next 12 occurrences
-        base_date = datetime.fromisoformat(event_dict["event_date"])
-        for i in range(1, 13):
-            if event_dict["recurrence_pattern"] == "weekly":
-                next_date = base_date + timedelta(weeks=i)
-            elif event_dict["recurrence_pattern"] == "monthly":
-                next_date = base_date + timedelta(days=30*i)
-            else:
-                break
-            
-            recurring_event = event_obj.model_dump()
-            recurring_event["id"] = str(uuid.uuid4())
-            recurring_event["event_date"] = next_date.isoformat()
-            await db.calendar_events.insert_one(recurring_event)
+    try:
+        key = occurrence_key(naive_utc(data.occurrence_date))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid occurrence date")
+    if data.cancelled:
+        update = {"$addToSet": {"exdates": key}}
+    else:
+        changes = {k: v for k, v in data.model_dump(include=set(OCCURRENCE_FIELDS)).items() if v is not None}
+        if "event_date" in changes:
+            changes["event_date"] = naive_utc(changes["event_date"])
+        if not changes:
+            raise HTTPException(status_code=400, detail="Nothing to change")
+        update = {"$set": {f"overrides.{key}": changes}}
     
-    return event_obj
+    result = await db.calendar_events.update_one({"id": event_id, "rrule": {"$ne": None}}, update)
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Recurring event not found")
+    await bump_collection_version("calendar_events")
+    return {"message": "Occurrence cancelled" if data.cancelled else "Occurrence updated"}
+
+def _parse_window_bound(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return naive_utc(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date range")
 
 @api_router.get("/calendar-events", response_model=List[CalendarEvent])
 async def get_calendar_events(
+    request: Request,
+    response: Response,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
     session_token: Optional[str] = Cookie(None),
     authorization: Optional[str] = Header(None)
 ):
@@ -835,25 +3372,562 @@ async def get_calendar_events(
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    events = await db.calendar_events.find({}, {"_id": 0}).sort("event_date", 1).to_list(1000)
-    return events
+    window_start = _parse_window_bound(start)
+    window_end = _parse_window_bound(end)
+    
+    # Without a window, recurring series are expanded over the span the old
+    # stored copies covered: from a month back to a year ahead. A missing
+    # bound is filled in from the one given the same way on either side.
+    # The span moves at midnight UTC, so the validators cover the resolved
+    # bounds and Last-Modified is never older than the day the span moved.
+    today = naive_utc(datetime.now(timezone.utc)).replace(hour=0, minute=0, second=0, microsecond=0)
+    defaulted = window_start is None or window_end is None
+    if window_start is None and window_end is None:
+        window_start, window_end = today - RECURRENCE_LOOKBACK, today + RECURRENCE_HORIZON
+    elif window_start is None:
+        window_start = min(window_end, today) - RECURRENCE_LOOKBACK
+    elif window_end is None:
+        window_end = max(window_start, today) + RECURRENCE_HORIZON
+    
+    version = await collection_version("calendar_events")
+    if defaulted:
+        updated_at = version.get("updated_at")
+        version = {**version, "updated_at": max(as_utc(updated_at), as_utc(today)) if updated_at else as_utc(today)}
+    scope = f"{occurrence_key(window_start)}/{occurrence_key(window_end)}"
+    cached = not_modified(request, response, "calendar_events", version, scope)
+    if cached:
+        return cached
+    
+    # One-off events come from the same resolved window as the occurrences
+    one_off_query = date_range_filter("event_date", window_start.isoformat(), window_end.isoformat())
+    events = await calendar_window(response, window_start, window_end, one_off_query, limit, cursor)
+    return list_response(response, events, CalendarEvent)
+
+@api_router.get("/calendar-events/month/{year}/{month}", response_model=List[CalendarEvent])
+async def get_calendar_month(
+    request: Request,
+    response: Response,
+    year: int = PathParam(..., ge=1, le=9998),
+    month: int = PathParam(..., ge=1, le=12),
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    version = await collection_version("calendar_events")
+    cached = not_modified(request, response, "calendar_events", version)
+    if cached:
+        return cached
+    
+    month_start = datetime(year, month, 1)
+    month_end = datetime(year + month // 12, month % 12 + 1, 1)
+    one_off_query = date_range_filter("event_date", month_start.isoformat(), month_end.isoformat())
+    # A month view is small enough to return whole
+    events = await calendar_window(response, month_start, month_end, one_off_query, MAX_PAGE_SIZE, None)
+    return list_response(response, events, CalendarEvent)
+
+# Dashboard: one auth check and one aggregation. drug_tests is the base
+# collection; the other collections are pulled in with $unionWith and split
+# back apart by $facet.
+DASHBOARD_SECTIONS = [
+    ("drug_tests", "test_date"),
+    ("meetings", "meeting_date"),
+    ("rent_payments", "payment_date"),
+]
+
+def dashboard_pipeline(user_id: str, limit: int) -> List[dict]:
+    def tagged(collection: str) -> List[dict]:
+        return [{"$match": {"user_id": user_id}}, {"$set": {"_section": collection}}]
+    
+    pipeline = tagged(DASHBOARD_SECTIONS[0][0])
+    for collection, _ in DASHBOARD_SECTIONS[1:]:
+        pipeline.append({"$unionWith": {"coll": collection, "pipeline": tagged(collection)}})
+    
+    facets = {}
+    for collection, sort_field in DASHBOARD_SECTIONS:
+        match = {"$match": {"_section": collection}}
+        facets[collection] = [
+            match,
+            {"$sort": {sort_field: -1, "id": -1}},
+            {"$limit": limit},
+            {"$project": {"_id": 0, "_section": 0}}
+        ]
+        facets[f"{collection}_count"] = [match, {"$count": "n"}]
+    facets["meetings_attended_count"] = [{"$match": {"_section": "meetings", "attended": True}}, {"$count": "n"}]
+    facets["rent_payments_confirmed_count"] = [{"$match": {"_section": "rent_payments", "confirmed": True}}, {"$count": "n"}]
+    pipeline.append({"$facet": facets})
+    return pipeline
+
+@api_router.get("/dashboard/{user_id}")
+async def get_dashboard(
+    user_id: str,
+    limit: int = 20,
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if user.role == "user" and user_id != user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    result = await db.drug_tests.aggregate(dashboard_pipeline(user_id, limit)).to_list(1)
+    facets = result[0] if result else {}
+    
+    dashboard = {"counts": {}}
+    for key, values in facets.items():
+        if key.endswith("_count"):
+            dashboard["counts"][key[:-len("_count")]] = values[0]["n"] if values else 0
+        else:
+            dashboard[key] = values
+    # The page only shows how many devotions there are, so count them from
+    # collection metadata instead of pulling every one through the pipeline
+    dashboard["counts"]["devotions"] = await db.devotions.estimated_document_count()
+    return dashboard
+
+# Compliance record export: streams the full history as NDJSON or CSV one
+# cursor batch at a time so memory stays flat regardless of history size
+EXPORT_BATCH_SIZE = 500
+EXPORT_COLLECTIONS = {
+    "drug-tests": ("drug_tests", "test_date", DrugTest),
+    "meetings": ("meetings", "meeting_date", Meeting),
+    "rent-payments": ("rent_payments", "payment_date", RentPayment),
+}
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return ";".join(str(v) for v in value)
+    return value
+
+async def _export_rows(cursor, fields: List[str], fmt: str):
+    batch = []
+    async for doc in cursor:
+        batch.append({field: _export_value(doc.get(field)) for field in fields})
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield _encode_export_batch(batch, fields, fmt)
+            batch = []
+    if batch:
+        yield _encode_export_batch(batch, fields, fmt)
+
+def _encode_export_batch(batch: List[dict], fields: List[str], fmt: str) -> str:
+    if fmt == "ndjson":
+        return "".join(json.dumps(row, default=str) + "\n" for row in batch)
+    buffer = io.StringIO()
+    csv.DictWriter(buffer, fieldnames=fields).writerows(batch)
+    return buffer.getvalue()
+
+async def _export_stream(cursor, fields: List[str], fmt: str):
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(fields)
+        yield buffer.getvalue()
+    async for chunk in _export_rows(cursor, fields, fmt):
+        yield chunk
+
+@api_router.get("/export/{collection}")
+async def export_records(
+    collection: str,
+    format: str = "ndjson",
+    user_id: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown export collection")
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Format must be ndjson or csv")
+    
+    collection_name, date_field, model = EXPORT_COLLECTIONS[collection]
+    query = {}
+    if user.role == "user":
+        query["user_id"] = user.id
+    elif user_id:
+        query["user_id"] = user_id
+    query.update(date_range_filter(date_field, start, end))
+    
+    cursor = db[collection_name].find(query, {"_id": 0}).sort(
+        [(date_field, ASCENDING), ("id", ASCENDING)]
+    ).batch_size(EXPORT_BATCH_SIZE)
+    fields = list(model.model_fields)
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        _export_stream(cursor, fields, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{collection}.{format}"'}
+    )
+
+# Date storage: timestamps are written as BSON dates, so sorts and range
+# filters compare dates and the TTL index can reap sessions. Documents from
+# before the switch hold ISO strings; datetime_migration converts them in
+# batches in the background, and reads accept either form until it is done.
+DATETIME_FIELDS = {
+    "users": ["created_at"],
+    "user_sessions": ["expires_at", "created_at"],
+    "drug_tests": ["test_date", "created_at"],
+    "meetings": ["meeting_date", "created_at"],
+    "rent_payments": ["payment_date", "confirmation_date", "created_at"],
+    "devotions": ["created_at"],
+    "reading_materials": ["created_at"],
+    "messages": ["created_at"],
+    "calendar_events": ["event_date", "created_at"],
+    "devotion_links": ["created_at"],
+    "event_requests": ["approved_at", "created_at"],
+    "admin_settings": ["updated_at"],
+    "resident_stats": ["last_test_date", "last_positive_date"],
+}
+
+def _pending_datetimes(fields: List[str]) -> dict:
+    return {"$or": [{field: {"$type": "string"}} for field in fields]}
+
+class DatetimeMigration:
+    def __init__(self, batch_size: int = 500, pause_seconds: float = 0.05):
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.state = "idle"
+        self.converted: dict = {}
+        self.skipped: dict = {}
+        self.started_at = None
+        self.finished_at = None
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def run(self):
+        self.state = "running"
+        self.converted, self.skipped = {}, {}
+        self.started_at, self.finished_at = datetime.now(timezone.utc), None
+        try:
+            for name, fields in DATETIME_FIELDS.items():
+                await self._migrate_collection(name, fields)
+        except asyncio.CancelledError:
+            self.state = "cancelled"
+            raise
+        except Exception:
+            self.state = "failed"
+            logger.exception("Datetime migration failed")
+        else:
+            self.state = "done"
+        finally:
+            self.finished_at = datetime.now(timezone.utc)
+
+    async def _migrate_collection(self, name: str, fields: List[str]):
+        # Newest first, so while both forms coexist the converted documents
+        # are the recent ones that date-sorted lists show first. Walking down
+        # _id also steps past values that fail to parse instead of looping.
+        collection = db[name]
+        pending = _pending_datetimes(fields)
+        last_id = None
+        while True:
+            query = pending if last_id is None else {"$and": [pending, {"_id": {"$lt": last_id}}]}
+            docs = await collection.find(query, {field: 1 for field in fields}).sort(
+                "_id", DESCENDING
+            ).limit(self.batch_size).to_list(self.batch_size)
+            if not docs:
+                return
+            last_id = docs[-1]["_id"]
+            
+            updates = []
+            for doc in docs:
+                original, converted = {}, {}
+                for field in fields:
+                    value = doc.get(field)
+                    if not isinstance(value, str):
+                        continue
+                    try:
+                        converted[field] = datetime.fromisoformat(value)
+                    except ValueError:
+                        self.skipped[name] = self.skipped.get(name, 0) + 1
+                        continue
+                    original[field] = value
+                if converted:
+                    # Matching the old values leaves concurrent rewrites alone
+                    updates.append(UpdateOne({"_id": doc["_id"], **original}, {"$set": converted}))
+            if updates:
+                result = await collection.bulk_write(updates, ordered=False)
+                self.converted[name] = self.converted.get(name, 0) + result.modified_count
+            await asyncio.sleep(self.pause_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "batch_size": self.batch_size,
+            "converted": self.converted,
+            "skipped": self.skipped,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+datetime_migration = DatetimeMigration(
+    batch_size=int(os.environ.get('DATETIME_MIGRATION_BATCH', '500')),
+    pause_seconds=float(os.environ.get('DATETIME_MIGRATION_PAUSE', '0.05')),
+)
+
+@api_router.get("/admin/datetime-migration")
+async def get_datetime_migration(
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user or user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    remaining = {}
+    for name, fields in DATETIME_FIELDS.items():
+        remaining[name] = await db[name].count_documents(_pending_datetimes(fields))
+    return {**datetime_migration.stats(), "remaining": remaining}
+
+@api_router.post("/admin/datetime-migration")
+async def start_datetime_migration(
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user or user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    datetime_migration.start()
+    return {"message": "Datetime migration running"}
+
+# Indexes: (collection, keys, options) for every query pattern used above.
+# user_sessions.expires_at and session_revocations.expires_at are stored as
+# BSON dates so TTL indexes can reap expired entries.
+INDEX_SPECS = [
+    ("users", [("id", ASCENDING)], {"unique": True}),
+    ("users", [("email", ASCENDING)], {"unique": True}),
+    ("user_sessions", [("session_token", ASCENDING)], {"unique": True}),
+    ("user_sessions", [("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ("session_revocations", [("jti", ASCENDING)], {"sparse": True}),
+    ("session_revocations", [("user_id", ASCENDING)], {"sparse": True}),
+    ("session_revocations", [("exp", ASCENDING)], {}),
+    ("session_revocations", [("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ("drug_tests", [("id", ASCENDING)], {"unique": True}),
+    ("drug_tests", [("user_id", ASCENDING), ("test_date", DESCENDING), ("id", DESCENDING)], {}),
+    ("drug_tests", [("test_date", DESCENDING), ("id", DESCENDING)], {}),
+    ("meetings", [("id", ASCENDING)], {"unique": True}),
+    ("meetings", [("user_id", ASCENDING), ("meeting_date", DESCENDING), ("id", DESCENDING)], {}),
+    ("meetings", [("meeting_date", DESCENDING), ("id", DESCENDING)], {}),
+    ("rent_payments", [("id", ASCENDING)], {"unique": True}),
+    ("rent_payments", [("user_id", ASCENDING), ("payment_date", DESCENDING), ("id", DESCENDING)], {}),
+    ("rent_payments", [("payment_date", DESCENDING), ("id", DESCENDING)], {}),
+    ("devotions", [("created_at", DESCENDING), ("id", DESCENDING)], {}),
+    ("reading_materials", [("created_at", DESCENDING), ("id", DESCENDING)], {}),
+    ("messages", [("id", ASCENDING)], {"unique": True}),
+    ("messages", [("sender_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], {}),
+    ("messages", [("recipient_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], {}),
+    ("devotions", [("title", TEXT), ("scripture_reference", TEXT), ("content", TEXT)], {"name": "search", "weights": {"title": 10, "scripture_reference": 5, "content": 1}}),
+    ("reading_materials", [("title", TEXT), ("author", TEXT), ("category", TEXT), ("description", TEXT)], {"name": "search", "weights": {"title": 10, "author": 5, "category": 3, "description": 1}}),
+    ("messages", [("content", TEXT)], {"name": "search"}),
+    ("event_requests", [("id", ASCENDING)], {"unique": True}),
+    ("event_requests", [("approval_batch", ASCENDING)], {"sparse": True}),
+    ("event_requests", [("created_at", DESCENDING), ("id", DESCENDING)], {}),
+    ("calendar_events", [("rrule", ASCENDING), ("event_date", ASCENDING), ("id", ASCENDING)], {}),
+    ("resident_stats", [("user_id", ASCENDING)], {"unique": True}),
+    ("upload_derivatives", [("url", ASCENDING)], {"unique": True}),
+    ("uploads", [("hash", ASCENDING)], {"unique": True}),
+    ("collection_versions", [("collection", ASCENDING)], {"unique": True}),
+]
+
+# Representative route queries for the explain() self-check:
+# (route, collection, filter, sort)
+INDEX_CHECK_QUERIES = [
+    ("get_current_user", "user_sessions", {"session_token": ""}, None),
+    ("get_current_user", "users", {"id": ""}, None),
+    ("create_session", "users", {"email": ""}, None),
+    ("get_drug_tests", "drug_tests", {"user_id": ""}, [("test_date", DESCENDING), ("id", DESCENDING)]),
+    ("get_drug_tests", "drug_tests", {}, [("test_date", DESCENDING), ("id", DESCENDING)]),
+    ("get_meetings", "meetings", {"user_id": ""}, [("meeting_date", DESCENDING), ("id", DESCENDING)]),
+    ("get_meetings", "meetings", {}, [("meeting_date", DESCENDING), ("id", DESCENDING)]),
+    ("get_rent_payments", "rent_payments", {"user_id": ""}, [("payment_date", DESCENDING), ("id", DESCENDING)]),
+    ("get_rent_payments", "rent_payments", {}, [("payment_date", DESCENDING), ("id", DESCENDING)]),
+    ("confirm_rent_payment", "rent_payments", {"id": ""}, None),
+    ("get_devotions", "devotions", {}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("get_reading_materials", "reading_materials", {}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("get_messages", "messages", {"$or": [{"sender_id": ""}, {"recipient_id": ""}, {"recipient_id": None}]}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("mark_message_read", "messages", {"id": ""}, None),
+    ("search", "devotions", {"$text": {"$search": "hope"}}, None),
+    ("search", "reading_materials", {"$text": {"$search": "hope"}}, None),
+    ("search", "messages", {"$text": {"$search": "hope"}, "recipient_id": None}, None),
+    ("get_event_requests", "event_requests", {}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("approve_event_request", "event_requests", {"id": ""}, None),
+    ("get_calendar_events", "calendar_events", {"rrule": None}, [("event_date", ASCENDING), ("id", ASCENDING)]),
+    ("get_calendar_events", "calendar_events", {"$and": [{"rrule": None}, {"event_date": {"$gte": datetime(2000, 1, 1), "$lt": datetime(2000, 2, 1)}}]}, [("event_date", ASCENDING), ("id", ASCENDING)]),
+    ("get_calendar_events", "calendar_events", {"rrule": {"$ne": None}, "event_date": {"$lt": datetime(2100, 1, 1)}}, None),
+]
+
+async def ensure_indexes():
+    for collection, keys, options in INDEX_SPECS:
+        try:
+            await db[collection].create_index(keys, **options)
+        except OperationFailure as e:
+            logger.warning(f"Could not create index {keys} on {collection}: {e}")
+
+def _plan_stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+async def check_indexes() -> List[dict]:
+    report = []
+    for route, collection, query, sort in INDEX_CHECK_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = (await cursor.explain())["queryPlanner"]["winningPlan"]
+        stages = [stage for stage in _plan_stages(plan) if stage]
+        report.append({
+            "route": route,
+            "collection": collection,
+            "stages": stages,
+            "collection_scan": "COLLSCAN" in stages
+        })
+    return report
+
+@api_router.get("/admin/slow-queries")
+async def get_slow_queries(
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user or user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "explain_sample": slow_query_log.explain_sample,
+        "entries": list(reversed(slow_query_log.entries))
+    }
+
+@api_router.get("/admin/index-check")
+async def get_index_check(
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(session_token, authorization)
+    if not user or user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return await check_indexes()
+
+# Prometheus scrapes /metrics with METRICS_TOKEN as a bearer token; admins
+# can read it with their session
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(
+    session_token: Optional[str] = Cookie(None),
+    authorization: Optional[str] = Header(None)
+):
+    bearer = authorization.replace('Bearer ', '') if authorization else ''
+    if not (METRICS_TOKEN and hmac.compare_digest(bearer.encode(), METRICS_TOKEN.encode())):
+        user = await get_current_user(session_token, authorization)
+        if not user or user.role != "admin":
+            raise HTTPException(status_code=403, detail="Admin only")
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 app.include_router(api_router)
 
+app.add_middleware(UploadSizeLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Outermost, so its timings include every other middleware
+app.add_middleware(MetricsMiddleware)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def start_image_pool():
+    global image_pool
+    image_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+
+@app.on_event("startup")
+async def start_message_hub():
+    await message_hub.start()
+
+@app.on_event("startup")
+async def start_session_store():
+    await session_store.start()
+
+@app.on_event("startup")
+async def attach_slow_query_log():
+    # Explains are scheduled from the driver's threads onto this loop
+    slow_query_log.loop = asyncio.get_running_loop()
+
+@app.on_event("startup")
+async def bootstrap_indexes():
+    await ensure_indexes()
+    if os.environ.get('INDEX_SELF_CHECK', 'false').lower() == 'true':
+        for entry in await check_indexes():
+            if entry["collection_scan"]:
+                logger.warning(f"Collection scan in {entry['route']} on {entry['collection']}: {entry['stages']}")
+
+@app.on_event("startup")
+async def start_datetime_migration_task():
+    if os.environ.get('DATETIME_MIGRATION_ON_STARTUP', 'true').lower() == 'true':
+        datetime_migration.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    await message_hub.stop()
+    await session_store.stop()
+    await datetime_migration.stop()
+    if image_pool is not None:
+        image_pool.shutdown(wait=False, cancel_futures=True)
+    if _session_http is not None:
+        await _session_http.aclose()
+    client.close()
+
+# Maintenance commands: python server.py <command>
+async def _run_command(command: str):
+    if command == "rebuild-stats":
+        rebuilt = await rebuild_resident_stats()
+        logger.info(f"Rebuilt resident stats for {rebuilt} residents")
+    elif command == "migrate-datetimes":
+        await datetime_migration.run()
+        logger.info(f"Datetime migration {datetime_migration.state}: converted {datetime_migration.converted}, skipped {datetime_migration.skipped}")
+    elif command == "sweep-sessions":
+        removed = await session_store.sweep()
+        logger.info(f"Removed {removed} expired sessions from the {session_store.name} session store")
+    else:
+        raise SystemExit(f"Unknown command: {command}")
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 2:
+        raise SystemExit("Usage: python server.py <rebuild-stats|migrate-datetimes|sweep-sessions>")
+    asyncio.run(_run_command(sys.argv[1]))
\ No newline at end of file
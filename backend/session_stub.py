@@ -0,0 +1,37 @@
+# Local stand-in for the OAuth session-data service used by create_session.
+#
+#   uvicorn session_stub:app --port 8099
+#   SESSION_DATA_URL=http://127.0.0.1:8099/auth/v1/env/oauth/session-data uvicorn server:app
+#
+# STUB_LATENCY_MS adds a delay to every response, STUB_FAILURE_RATE (0-1)
+# answers that share of requests with a 503. A session id starting with
+# "invalid" gets a 404, like an expired session upstream.
+from fastapi import FastAPI, HTTPException, Header
+from typing import Optional
+import asyncio
+import hashlib
+import os
+import random
+
+STUB_LATENCY_MS = float(os.environ.get('STUB_LATENCY_MS', '0'))
+STUB_FAILURE_RATE = float(os.environ.get('STUB_FAILURE_RATE', '0'))
+
+app = FastAPI()
+
+@app.get("/auth/v1/env/oauth/session-data")
+async def session_data(x_session_id: Optional[str] = Header(None)):
+    if STUB_LATENCY_MS:
+        await asyncio.sleep(STUB_LATENCY_MS / 1000)
+    if random.random() < STUB_FAILURE_RATE:
+        raise HTTPException(status_code=503, detail="Stub failure")
+    if not x_session_id or x_session_id.startswith("invalid"):
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    # Stable identity per session id so repeat logins map to the same user
+    user_key = hashlib.sha256(x_session_id.encode()).hexdigest()[:12]
+    return {
+        "email": f"resident-{user_key}@example.com",
+        "name": f"Resident {user_key}",
+        "picture": "https://via.placeholder.com/150",
+        "session_token": f"stub_session_{user_key}_{random.getrandbits(32):08x}"
+    }
@@ -0,0 +1,25 @@
+import axios from 'axios';
+
+// List endpoints return one page and the cursor for the next one in this header
+const NEXT_CURSOR_HEADER = 'x-next-cursor';
+
+export async function fetchPage(url, params = {}, cursor = null) {
+  const response = await axios.get(url, {
+    params: cursor ? { ...params, cursor } : params,
+    withCredentials: true
+  });
+  return { items: response.data, nextCursor: response.headers[NEXT_CURSOR_HEADER] || null };
+}
+
+// Follows the cursor until the list runs out; for pickers and reference
+// lists that need every row
+export async function fetchAll(url, params = {}) {
+  let items = [];
+  let cursor = null;
+  do {
+    const page = await fetchPage(url, params, cursor);
+    items = items.concat(page.items);
+    cursor = page.nextCursor;
+  } while (cursor);
+  return items;
+}
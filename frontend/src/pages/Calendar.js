@@ -16,6 +16,7 @@ import { Plus, Calendar as CalendarIcon, MapPin } from 'lucide-react';
 const Calendar = () => {
   const { user, API } = useContext(AuthContext);
   const [events, setEvents] = useState([]);
+  const [upcomingEvents, setUpcomingEvents] = useState([]);
   const [currentDate, setCurrentDate] = useState(new Date());
   const [open, setOpen] = useState(false);
   const [formData, setFormData] = useState({
@@ -28,17 +29,35 @@ const Calendar = () => {
 
   useEffect(() => {
     loadEvents();
+  }, [currentDate.getFullYear(), currentDate.getMonth()]);
+
+  useEffect(() => {
+    loadUpcomingEvents();
   }, []);
 
   const loadEvents = async () => {
     try {
-      const response = await axios.get(`${API}/calendar-events`, { withCredentials: true });
+      const year = currentDate.getFullYear();
+      const month = currentDate.getMonth() + 1;
+      const response = await axios.get(`${API}/calendar-events/month/${year}/${month}`, { withCredentials: true });
       setEvents(response.data);
     } catch (error) {
       toast.error('Failed to load events');
     }
   };
 
+  const loadUpcomingEvents = async () => {
+    try {
+      const response = await axios.get(`${API}/calendar-events`, {
+        params: { start: new Date().toISOString(), limit: 10 },
+        withCredentials: true
+      });
+      setUpcomingEvents(response.data);
+    } catch (error) {
+      console.error('Failed to load upcoming events');
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     try {
@@ -46,6 +65,7 @@ const Calendar = () => {
       toast.success('Event created');
       setOpen(false);
       loadEvents();
+      loadUpcomingEvents();
       setFormData({
         title: '',
         description: '',
@@ -246,9 +266,7 @@ const Calendar = () => {
               </CardHeader>
               <CardContent>
                 <div className="space-y-4 max-h-[600px] overflow-y-auto">
-                  {events
-                    .filter(event => new Date(event.event_date) >= new Date())
-                    .slice(0, 10)
+                  {upcomingEvents
                     .map(event => (
                       <div key={event.id} className="border-l-4 pl-4 py-2" style={{ borderColor: getEventColor(event.event_type).replace('bg-', '#') }} data-testid={`event-${event.id}`}>
                         <p className="font-semibold text-gray-900" style={{ fontFamily: 'Space Grotesk, sans-serif' }}>
@@ -271,7 +289,7 @@ const Calendar = () => {
                         )}
                       </div>
                     ))}
-                  {events.filter(e => new Date(e.event_date) >= new Date()).length === 0 && (
+                  {upcomingEvents.length === 0 && (
                     <div className="text-center py-8">
                       <CalendarIcon className="w-12 h-12 text-gray-400 mx-auto mb-4" />
                       <p className="text-gray-600" style={{ fontFamily: 'Inter, sans-serif' }}>No upcoming events</p>
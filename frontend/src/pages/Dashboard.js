@@ -5,7 +5,9 @@ import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { ClipboardCheck, Calendar, DollarSign, BookOpen, Download, Printer } from 'lucide-react';
+import { toast } from 'sonner';
 import axios from 'axios';
+import { fetchAll } from '@/lib/pagination';
 import { format } from 'date-fns';
 
 const Dashboard = () => {
@@ -18,11 +20,6 @@ const Dashboard = () => {
   });
   const [selectedUserId, setSelectedUserId] = useState('');
   const [users, setUsers] = useState([]);
-  const [detailedData, setDetailedData] = useState({
-    drugTests: [],
-    meetings: [],
-    payments: []
-  });
 
   useEffect(() => {
     if (user) {
@@ -42,10 +39,10 @@ const Dashboard = () => {
 
   const loadUsers = async () => {
     try {
-      const response = await axios.get(`${API}/users`, { withCredentials: true });
-      setUsers(response.data.filter(u => u.role === 'user'));
-      if (response.data.length > 0) {
-        setSelectedUserId(response.data.find(u => u.role === 'user')?.id || user.id);
+      const allUsers = await fetchAll(`${API}/users`);
+      setUsers(allUsers.filter(u => u.role === 'user'));
+      if (allUsers.length > 0) {
+        setSelectedUserId(allUsers.find(u => u.role === 'user')?.id || user.id);
       }
     } catch (error) {
       console.error('Error loading users:', error);
@@ -54,31 +51,44 @@ const Dashboard = () => {
 
   const loadStats = async () => {
     try {
-      const [drugTests, meetings, payments, devotions] = await Promise.all([
-        axios.get(`${API}/drug-tests?user_id=${selectedUserId}`, { withCredentials: true }),
-        axios.get(`${API}/meetings?user_id=${selectedUserId}`, { withCredentials: true }),
-        axios.get(`${API}/rent-payments?user_id=${selectedUserId}`, { withCredentials: true }),
-        axios.get(`${API}/devotions`, { withCredentials: true })
-      ]);
-
-      setDetailedData({
-        drugTests: drugTests.data,
-        meetings: meetings.data,
-        payments: payments.data
-      });
+      const response = await axios.get(`${API}/dashboard/${selectedUserId}`, { params: { limit: 1 }, withCredentials: true });
+      const dashboard = response.data;
 
       setStats({
-        drugTests: drugTests.data.length,
-        meetings: meetings.data.filter(m => m.attended).length,
-        payments: payments.data.filter(p => p.confirmed).length,
-        devotions: devotions.data.length
+        drugTests: dashboard.counts.drug_tests,
+        meetings: dashboard.counts.meetings_attended,
+        payments: dashboard.counts.rent_payments_confirmed,
+        devotions: dashboard.counts.devotions
       });
     } catch (error) {
       console.error('Error loading stats:', error);
     }
   };
 
-  const exportToCSV = () => {
+  // The dashboard call only returns the latest rows; the export endpoint
+  // streams the resident's full history
+  const fetchHistory = async (collection) => {
+    const response = await axios.get(`${API}/export/${collection}`, {
+      params: { format: 'ndjson', user_id: selectedUserId },
+      responseType: 'text',
+      withCredentials: true
+    });
+    return response.data.split('\n').filter(line => line).map(line => JSON.parse(line));
+  };
+
+  const exportToCSV = async () => {
+    let drugTests, meetings, payments;
+    try {
+      [drugTests, meetings, payments] = await Promise.all([
+        fetchHistory('drug-tests'),
+        fetchHistory('meetings'),
+        fetchHistory('rent-payments')
+      ]);
+    } catch (error) {
+      toast.error('Failed to export records');
+      return;
+    }
+
     const selectedUser = users.find(u => u.id === selectedUserId) || user;
     let csv = `1:17 Discipleship - Dashboard Report\n`;
     csv += `User: ${selectedUser.name}\n`;
@@ -86,19 +96,19 @@ const Dashboard = () => {
 
     csv += `Drug Tests\n`;
     csv += `Date,Type,Result,Administered By,Notes\n`;
-    detailedData.drugTests.forEach(test => {
+    drugTests.forEach(test => {
       csv += `${format(new Date(test.test_date), 'PP')},${test.test_type},${test.result},${test.administered_by},"${test.notes || ''}"\n`;
     });
 
     csv += `\nMeetings\n`;
     csv += `Date,Type,Attended,Recorded By,Notes\n`;
-    detailedData.meetings.forEach(meeting => {
+    meetings.forEach(meeting => {
       csv += `${format(new Date(meeting.meeting_date), 'PP')},${meeting.meeting_type},${meeting.attended ? 'Yes' : 'No'},${meeting.recorded_by},"${meeting.notes || ''}"\n`;
     });
 
     csv += `\nRent Payments\n`;
     csv += `Date,Amount,Confirmed,Confirmed By\n`;
-    detailedData.payments.forEach(payment => {
+    payments.forEach(payment => {
       csv += `${format(new Date(payment.payment_date), 'PP')},$${payment.amount},${payment.confirmed ? 'Yes' : 'No'},${payment.confirmed_by || 'Pending'}\n`;
     });
 
@@ -9,13 +9,15 @@ import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger } from
 import { Textarea } from '@/components/ui/textarea';
 import { toast } from 'sonner';
 import axios from 'axios';
+import { fetchAll } from '@/lib/pagination';
 import { format } from 'date-fns';
-import { Plus, BookOpen } from 'lucide-react';
+import { Plus, BookOpen, Search } from 'lucide-react';
 
 const Devotions = () => {
   const { user, API } = useContext(AuthContext);
   const [devotions, setDevotions] = useState([]);
   const [open, setOpen] = useState(false);
+  const [query, setQuery] = useState('');
   const [formData, setFormData] = useState({
     title: '',
     content: '',
@@ -28,13 +30,29 @@ const Devotions = () => {
 
   const loadDevotions = async () => {
     try {
-      const response = await axios.get(`${API}/devotions`, { withCredentials: true });
-      setDevotions(response.data);
+      setDevotions(await fetchAll(`${API}/devotions`));
     } catch (error) {
       toast.error('Failed to load devotions');
     }
   };
 
+  const handleSearch = async (e) => {
+    e.preventDefault();
+    if (!query.trim()) {
+      loadDevotions();
+      return;
+    }
+    try {
+      const response = await axios.get(`${API}/search`, {
+        params: { q: query, types: 'devotions' },
+        withCredentials: true
+      });
+      setDevotions(response.data.map(result => result.document));
+    } catch (error) {
+      toast.error('Search failed');
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     try {
@@ -111,6 +129,18 @@ const Devotions = () => {
           )}
         </div>
 
+        <form onSubmit={handleSearch} className="flex space-x-2">
+          <Input
+            data-testid="devotion-search-input"
+            placeholder="Search devotions"
+            value={query}
+            onChange={(e) => setQuery(e.target.value)}
+          />
+          <Button data-testid="devotion-search-button" type="submit" variant="outline">
+            <Search className="w-4 h-4" />
+          </Button>
+        </form>
+
         <div className="space-y-6">
           {devotions.length === 0 ? (
             <Card className="bg-white shadow-lg">
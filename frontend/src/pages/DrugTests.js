@@ -10,12 +10,14 @@ import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger } from
 import { Textarea } from '@/components/ui/textarea';
 import { toast } from 'sonner';
 import axios from 'axios';
+import { fetchAll, fetchPage } from '@/lib/pagination';
 import { format } from 'date-fns';
 import { Plus, FileText, Upload, Download, Printer } from 'lucide-react';
 
 const DrugTests = () => {
   const { user, API } = useContext(AuthContext);
   const [tests, setTests] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [users, setUsers] = useState([]);
   const [open, setOpen] = useState(false);
   const [selectedUserId, setSelectedUserId] = useState('');
@@ -46,11 +48,12 @@ const DrugTests = () => {
     }
   }, [selectedUserId]);
 
-  const loadTests = async () => {
+  const loadTests = async (cursor = null) => {
     try {
       const userId = user?.role === 'user' ? user.id : selectedUserId;
-      const response = await axios.get(`${API}/drug-tests${userId ? `?user_id=${userId}` : ''}`, { withCredentials: true });
-      setTests(response.data);
+      const page = await fetchPage(`${API}/drug-tests`, userId ? { user_id: userId } : {}, cursor);
+      setTests(prev => cursor ? [...prev, ...page.items] : page.items);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       toast.error('Failed to load drug tests');
     }
@@ -58,8 +61,8 @@ const DrugTests = () => {
 
   const loadUsers = async () => {
     try {
-      const response = await axios.get(`${API}/users`, { withCredentials: true });
-      const regularUsers = response.data.filter(u => u.role === 'user');
+      const allUsers = await fetchAll(`${API}/users`);
+      const regularUsers = allUsers.filter(u => u.role === 'user');
       setUsers(regularUsers);
       if (regularUsers.length > 0) {
         setSelectedUserId(regularUsers[0].id);
@@ -307,6 +310,11 @@ const DrugTests = () => {
               </Card>
             ))
           )}
+          {nextCursor && (
+            <div className="text-center">
+              <Button variant="outline" onClick={() => loadTests(nextCursor)}>Load more</Button>
+            </div>
+          )}
         </div>
       </div>
     </Layout>
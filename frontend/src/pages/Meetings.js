@@ -11,12 +11,14 @@ import { Textarea } from '@/components/ui/textarea';
 import { Checkbox } from '@/components/ui/checkbox';
 import { toast } from 'sonner';
 import axios from 'axios';
+import { fetchAll, fetchPage } from '@/lib/pagination';
 import { format } from 'date-fns';
 import { Plus, Calendar as CalendarIcon, Download, Printer } from 'lucide-react';
 
 const Meetings = () => {
   const { user, API } = useContext(AuthContext);
   const [meetings, setMeetings] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [users, setUsers] = useState([]);
   const [selectedUserId, setSelectedUserId] = useState('');
   const [open, setOpen] = useState(false);
@@ -45,11 +47,12 @@ const Meetings = () => {
     }
   }, [selectedUserId]);
 
-  const loadMeetings = async () => {
+  const loadMeetings = async (cursor = null) => {
     try {
       const userId = user?.role === 'user' ? user.id : selectedUserId;
-      const response = await axios.get(`${API}/meetings${userId ? `?user_id=${userId}` : ''}`, { withCredentials: true });
-      setMeetings(response.data);
+      const page = await fetchPage(`${API}/meetings`, userId ? { user_id: userId } : {}, cursor);
+      setMeetings(prev => cursor ? [...prev, ...page.items] : page.items);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       toast.error('Failed to load meetings');
     }
@@ -57,8 +60,8 @@ const Meetings = () => {
 
   const loadUsers = async () => {
     try {
-      const response = await axios.get(`${API}/users`, { withCredentials: true });
-      const regularUsers = response.data.filter(u => u.role === 'user');
+      const allUsers = await fetchAll(`${API}/users`);
+      const regularUsers = allUsers.filter(u => u.role === 'user');
       setUsers(regularUsers);
       if (regularUsers.length > 0) {
         setSelectedUserId(regularUsers[0].id);
@@ -264,6 +267,11 @@ const Meetings = () => {
               </Card>
             ))
           )}
+          {nextCursor && (
+            <div className="text-center">
+              <Button variant="outline" onClick={() => loadMeetings(nextCursor)}>Load more</Button>
+            </div>
+          )}
         </div>
       </div>
     </Layout>
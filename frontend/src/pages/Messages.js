@@ -7,12 +7,15 @@ import { Textarea } from '@/components/ui/textarea';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { toast } from 'sonner';
 import axios from 'axios';
+import { fetchAll, fetchPage } from '@/lib/pagination';
 import { format } from 'date-fns';
 import { Send, MessageCircle } from 'lucide-react';
 
 const Messages = () => {
   const { user, API } = useContext(AuthContext);
   const [messages, setMessages] = useState([]);
+  // undefined until the first page arrives, null once history runs out
+  const [nextCursor, setNextCursor] = useState(undefined);
   const [users, setUsers] = useState([]);
   const [content, setContent] = useState('');
   const [recipientId, setRecipientId] = useState('broadcast');
@@ -21,8 +24,14 @@ const Messages = () => {
   useEffect(() => {
     loadMessages();
     loadUsers();
-    const interval = setInterval(loadMessages, 5000);
-    return () => clearInterval(interval);
+    const stream = new EventSource(`${API}/messages/stream`, { withCredentials: true });
+    stream.addEventListener('message', (event) => {
+      const message = JSON.parse(event.data);
+      setMessages(prev => prev.some(m => m.id === message.id) ? prev : [message, ...prev]);
+    });
+    // Catch up on anything sent while the stream was reconnecting
+    stream.onopen = () => loadMessages();
+    return () => stream.close();
   }, []);
 
   useEffect(() => {
@@ -31,17 +40,35 @@ const Messages = () => {
 
   const loadMessages = async () => {
     try {
-      const response = await axios.get(`${API}/messages`, { withCredentials: true });
-      setMessages(response.data);
+      const page = await fetchPage(`${API}/messages`);
+      // Merge rather than replace, so a reconnect catch-up keeps older pages
+      setMessages(prev => {
+        const latestIds = new Set(page.items.map(m => m.id));
+        return [...page.items, ...prev.filter(m => !latestIds.has(m.id))];
+      });
+      setNextCursor(cursor => cursor === undefined ? page.nextCursor : cursor);
     } catch (error) {
       console.error('Failed to load messages');
     }
   };
 
+  const loadOlderMessages = async () => {
+    try {
+      const page = await fetchPage(`${API}/messages`, {}, nextCursor);
+      setMessages(prev => {
+        const loadedIds = new Set(prev.map(m => m.id));
+        return [...prev, ...page.items.filter(m => !loadedIds.has(m.id))];
+      });
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      toast.error('Failed to load older messages');
+    }
+  };
+
   const loadUsers = async () => {
     try {
-      const response = await axios.get(`${API}/users`, { withCredentials: true });
-      setUsers(response.data.filter(u => u.id !== user?.id));
+      const allUsers = await fetchAll(`${API}/users`);
+      setUsers(allUsers.filter(u => u.id !== user?.id));
     } catch (error) {
       console.error('Failed to load users');
     }
@@ -57,7 +84,6 @@ const Messages = () => {
         recipient_id: recipientId === 'broadcast' ? null : recipientId
       }, { withCredentials: true });
       setContent('');
-      loadMessages();
       toast.success('Message sent');
     } catch (error) {
       toast.error('Failed to send message');
@@ -131,6 +157,11 @@ const Messages = () => {
                     );
                   })
                 )}
+                {nextCursor && (
+                  <div className="text-center">
+                    <Button variant="outline" size="sm" onClick={loadOlderMessages}>Load older messages</Button>
+                  </div>
+                )}
                 <div ref={messagesEndRef} />
               </CardContent>
             </Card>
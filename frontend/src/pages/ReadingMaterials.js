@@ -10,12 +10,14 @@ import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger } from
 import { Textarea } from '@/components/ui/textarea';
 import { toast } from 'sonner';
 import axios from 'axios';
-import { Plus, BookMarked, ExternalLink } from 'lucide-react';
+import { fetchAll } from '@/lib/pagination';
+import { Plus, BookMarked, ExternalLink, Search } from 'lucide-react';
 
 const ReadingMaterials = () => {
   const { user, API } = useContext(AuthContext);
   const [materials, setMaterials] = useState([]);
   const [open, setOpen] = useState(false);
+  const [query, setQuery] = useState('');
   const [formData, setFormData] = useState({
     title: '',
     author: '',
@@ -30,13 +32,29 @@ const ReadingMaterials = () => {
 
   const loadMaterials = async () => {
     try {
-      const response = await axios.get(`${API}/reading-materials`, { withCredentials: true });
-      setMaterials(response.data);
+      setMaterials(await fetchAll(`${API}/reading-materials`));
     } catch (error) {
       toast.error('Failed to load reading materials');
     }
   };
 
+  const handleSearch = async (e) => {
+    e.preventDefault();
+    if (!query.trim()) {
+      loadMaterials();
+      return;
+    }
+    try {
+      const response = await axios.get(`${API}/search`, {
+        params: { q: query, types: 'reading_materials' },
+        withCredentials: true
+      });
+      setMaterials(response.data.map(result => result.document));
+    } catch (error) {
+      toast.error('Search failed');
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     try {
@@ -157,6 +175,18 @@ const ReadingMaterials = () => {
           )}
         </div>
 
+        <form onSubmit={handleSearch} className="flex space-x-2">
+          <Input
+            data-testid="material-search-input"
+            placeholder="Search reading materials"
+            value={query}
+            onChange={(e) => setQuery(e.target.value)}
+          />
+          <Button data-testid="material-search-button" type="submit" variant="outline">
+            <Search className="w-4 h-4" />
+          </Button>
+        </form>
+
         {materials.length === 0 ? (
           <Card className="bg-white shadow-lg">
             <CardContent className="p-12 text-center">
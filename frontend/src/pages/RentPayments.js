@@ -10,12 +10,14 @@ import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogTrigger } from
 import { Textarea } from '@/components/ui/textarea';
 import { toast } from 'sonner';
 import axios from 'axios';
+import { fetchAll, fetchPage } from '@/lib/pagination';
 import { format } from 'date-fns';
 import { Plus, DollarSign, Check, X, Download, Printer, Upload } from 'lucide-react';
 
 const RentPayments = () => {
   const { user, API } = useContext(AuthContext);
   const [payments, setPayments] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [users, setUsers] = useState([]);
   const [selectedUserId, setSelectedUserId] = useState('');
   const [open, setOpen] = useState(false);
@@ -57,8 +59,8 @@ const RentPayments = () => {
 
   const loadUsers = async () => {
     try {
-      const response = await axios.get(`${API}/users`, { withCredentials: true });
-      const regularUsers = response.data.filter(u => u.role === 'user');
+      const allUsers = await fetchAll(`${API}/users`);
+      const regularUsers = allUsers.filter(u => u.role === 'user');
       setUsers(regularUsers);
       if (regularUsers.length > 0) {
         setSelectedUserId(regularUsers[0].id);
@@ -68,11 +70,12 @@ const RentPayments = () => {
     }
   };
 
-  const loadPayments = async () => {
+  const loadPayments = async (cursor = null) => {
     try {
       const userId = user?.role === 'user' ? user.id : selectedUserId;
-      const response = await axios.get(`${API}/rent-payments${userId ? `?user_id=${userId}` : ''}`, { withCredentials: true });
-      setPayments(response.data);
+      const page = await fetchPage(`${API}/rent-payments`, userId ? { user_id: userId } : {}, cursor);
+      setPayments(prev => cursor ? [...prev, ...page.items] : page.items);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       toast.error('Failed to load payments');
     }
@@ -355,6 +358,11 @@ const RentPayments = () => {
               );
             })
           )}
+          {nextCursor && (
+            <div className="text-center">
+              <Button variant="outline" onClick={() => loadPayments(nextCursor)}>Load more</Button>
+            </div>
+          )}
         </div>
       </div>
     </Layout>
@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# server.py reads these at import time
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+# Reached through a symlink, as on hosts where the upload volume is linked in
+UPLOAD_LINK = Path(tempfile.mkdtemp(prefix="uploads-link-")) / "uploads"
+UPLOAD_LINK.symlink_to(tempfile.mkdtemp(prefix="uploads-"))
+os.environ.setdefault("UPLOAD_DIR", str(UPLOAD_LINK))
+os.environ.setdefault("DATETIME_MIGRATION_ON_STARTUP", "false")
+
+import server  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+USERS = [("resident", "user"), ("mentor", "mentor"), ("admin", "admin")]
+
+
+def auth(user_id: str) -> dict:
+    return {"Authorization": f"Bearer token-{user_id}"}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = AsyncMongoMockClient()["test_database"]
+    monkeypatch.setattr(server, "db", database)
+    # Process-wide caches would otherwise carry state between tests
+    monkeypatch.setattr(server, "principal_cache", server.PrincipalCache())
+    monkeypatch.setattr(server, "reference_cache", server.ReadThroughCache())
+    return database
+
+
+@pytest.fixture
+def client(db):
+    with TestClient(server.app) as test_client:
+        test_client.portal.call(_seed_users, db)
+        yield test_client
+
+
+async def _seed_users(db):
+    now = datetime.now(timezone.utc)
+    for user_id, role in USERS:
+        await db.users.insert_one({
+            "id": user_id,
+            "email": f"{user_id}@example.com",
+            "name": user_id.title(),
+            "picture": "",
+            "role": role,
+            "created_at": now
+        })
+        await db.user_sessions.insert_one({
+            "user_id": user_id,
+            "session_token": f"token-{user_id}",
+            "expires_at": now + timedelta(days=1),
+            "created_at": now
+        })
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from fastapi import Response
+from starlette.requests import Request
+
+import server
+
+
+def request(headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/devotions",
+        "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    })
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value, usegmt=True)
+
+
+def test_matching_etag_is_not_modified():
+    version = {"version": 3}
+    response = Response()
+    assert server.not_modified(request({}), response, "devotions", version) is None
+    etag = response.headers["etag"]
+    assert server.not_modified(request({"If-None-Match": etag}), Response(), "devotions", version).status_code == 304
+    assert server.not_modified(request({"If-None-Match": '"other"'}), Response(), "devotions", version) is None
+
+
+def test_if_modified_since_uses_whole_seconds():
+    updated_at = datetime.now(timezone.utc).replace(microsecond=700000) - timedelta(seconds=5)
+    version = {"version": 3, "updated_at": updated_at}
+    response = Response()
+    server.not_modified(request({}), response, "devotions", version)
+    last_modified = response.headers["last-modified"]
+    assert last_modified == http_date(updated_at.replace(microsecond=0))
+
+    cached = server.not_modified(request({"If-Modified-Since": last_modified}), Response(), "devotions", version)
+    assert cached.status_code == 304
+    earlier = http_date(updated_at - timedelta(seconds=1))
+    assert server.not_modified(request({"If-Modified-Since": earlier}), Response(), "devotions", version) is None
+
+
+def test_version_from_the_current_second_has_no_last_modified():
+    version = {"version": 4, "updated_at": datetime.now(timezone.utc)}
+    response = Response()
+    server.not_modified(request({}), response, "devotions", version)
+    assert "last-modified" not in response.headers
+
+    # A client holding this second's date must not be told nothing changed
+    this_second = http_date(datetime.now(timezone.utc))
+    assert server.not_modified(request({"If-Modified-Since": this_second}), Response(), "devotions", version) is None
@@ -0,0 +1,118 @@
+from datetime import datetime, timezone
+from functools import partial
+
+import pytest
+
+from tests.conftest import auth
+
+
+def seed_requests(client, db, *requests):
+    docs = [{
+        "id": request_id,
+        "user_id": "resident",
+        "title": f"Event {request_id}",
+        "event_date": "2025-03-01T18:00:00+00:00",
+        "event_type": "outing",
+        "status": "pending",
+        "created_at": datetime.now(timezone.utc),
+        **fields
+    } for request_id, fields in requests]
+    client.portal.call(db.event_requests.insert_many, docs)
+
+
+def request_doc(client, db, request_id) -> dict:
+    return client.portal.call(db.event_requests.find_one, {"id": request_id}, {"_id": 0})
+
+
+def approve(client, request_ids):
+    return client.post("/api/event-requests/approve", json={"request_ids": request_ids}, headers=auth("mentor"))
+
+
+def test_bulk_approve_reports_each_request(client, db):
+    seed_requests(client, db, ("ok", {}), ("bad", {"event_date": "next tuesday"}), ("done", {"status": "approved"}))
+
+    response = approve(client, ["ok", "bad", "done", "gone"])
+    assert response.status_code == 200
+    body = response.json()
+    assert body["approved"] == 1 and body["failed"] == 1
+    assert [result["status"] for result in body["results"]] == ["approved", "error", "not_pending", "not_found"]
+
+    event_id = body["results"][0]["event_id"]
+    assert request_doc(client, db, "ok")["event_id"] == event_id
+    assert client.portal.call(db.calendar_events.count_documents, {"id": event_id}) == 1
+    # The request that could not become an event was never claimed
+    bad = request_doc(client, db, "bad")
+    assert bad["status"] == "pending" and "approval_batch" not in bad
+
+
+def test_failed_inserts_release_their_claims(client, db):
+    seed_requests(client, db, ("first", {}), ("clash", {"title": "Taken"}))
+    client.portal.call(partial(db.calendar_events.create_index, "title", unique=True))
+    client.portal.call(db.calendar_events.insert_one, {"id": "existing", "title": "Taken"})
+
+    body = approve(client, ["first", "clash"]).json()
+    assert [result["status"] for result in body["results"]] == ["approved", "error"]
+    clash = request_doc(client, db, "clash")
+    assert clash["status"] == "pending"
+    assert not {"approved_by", "approved_at", "approval_batch", "event_id"} & set(clash)
+
+
+def test_write_failure_rolls_back_the_batch(client, db, monkeypatch):
+    seed_requests(client, db, ("first", {}), ("second", {}))
+
+    collection_class = type(db.calendar_events)
+    insert_many = collection_class.insert_many
+    calls = []
+
+    async def unavailable_once(self, *args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise ConnectionError("primary stepped down")
+        return await insert_many(self, *args, **kwargs)
+    # Collection wrappers are created per attribute access, so patch the class
+    monkeypatch.setattr(collection_class, "insert_many", unavailable_once)
+
+    with pytest.raises(ConnectionError):
+        approve(client, ["first", "second"])
+    for request_id in ("first", "second"):
+        assert request_doc(client, db, request_id)["status"] == "pending"
+
+    assert approve(client, ["first", "second"]).json()["approved"] == 2
+
+
+def approve_one(client, request_id):
+    return client.patch(f"/api/event-requests/{request_id}/approve", headers=auth("mentor"))
+
+
+def test_single_approve_creates_the_event(client, db):
+    seed_requests(client, db, ("ok", {}))
+    response = approve_one(client, "ok")
+    assert response.status_code == 200
+    event_id = response.json()["event_id"]
+    assert request_doc(client, db, "ok")["event_id"] == event_id
+    event = client.portal.call(db.calendar_events.find_one, {"id": event_id})
+    assert event["title"] == "Event ok"
+
+    assert approve_one(client, "ok").status_code == 409
+    assert approve_one(client, "gone").status_code == 404
+
+
+def test_single_approve_refuses_a_request_that_cannot_be_an_event(client, db):
+    seed_requests(client, db, ("bad", {"event_date": "next tuesday"}))
+    assert approve_one(client, "bad").status_code == 400
+    bad = request_doc(client, db, "bad")
+    assert bad["status"] == "pending" and "approved_by" not in bad
+    assert client.portal.call(db.calendar_events.count_documents, {}) == 0
+
+
+def test_single_approve_releases_the_claim_when_the_insert_fails(client, db, monkeypatch):
+    seed_requests(client, db, ("first", {}))
+
+    async def unavailable(self, *args, **kwargs):
+        raise ConnectionError("primary stepped down")
+    monkeypatch.setattr(type(db.calendar_events), "insert_one", unavailable)
+
+    with pytest.raises(ConnectionError):
+        approve_one(client, "first")
+    first = request_doc(client, db, "first")
+    assert first["status"] == "pending" and "event_id" not in first
@@ -0,0 +1,40 @@
+import pytest
+
+import server
+from tests.conftest import auth
+
+ENDPOINTS = ["/api/drug-tests", "/api/rent-payments", "/api/messages", "/api/calendar-events/month/2025/1"]
+
+
+def seed(client):
+    mentor = auth("mentor")
+    assert client.post("/api/drug-tests", json={
+        "user_id": "resident", "test_date": "2025-01-03T09:30:00+00:00", "test_type": "urine",
+        "result": "negative", "administered_by": "mentor"
+    }, headers=mentor).status_code == 200
+    payment = client.post("/api/rent-payments", json={
+        "user_id": "resident", "payment_date": "2025-01-02T12:00:00+00:00", "amount": 150.0
+    }, headers=mentor).json()
+    assert client.patch(f"/api/rent-payments/{payment['id']}/confirm", json={"confirmed": True, "confirmed_by": "admin"},
+                        headers=auth("admin")).status_code == 200
+    assert client.post("/api/messages", json={"content": "House meeting at six"}, headers=mentor).status_code == 200
+    for event in ({"event_date": "2025-01-10T18:00:00+00:00"},
+                  {"event_date": "2025-01-06T18:00:00+00:00", "rrule": "FREQ=WEEKLY;COUNT=3"}):
+        assert client.post("/api/calendar-events", json={"title": "Outing", "event_type": "outing", **event},
+                           headers=mentor).status_code == 200
+
+
+def fetch(client, monkeypatch, path: str, fast: bool):
+    monkeypatch.setattr(server, "FAST_JSON_RESPONSES", fast)
+    response = client.get(path, headers=auth("admin"))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_fast_path_matches_validated_output(client, monkeypatch, path):
+    seed(client)
+    slow = fetch(client, monkeypatch, path, False)
+    fast = fetch(client, monkeypatch, path, True)
+    assert slow and fast == slow
+    assert all(doc["created_at"].endswith("Z") for doc in fast)
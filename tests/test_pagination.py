@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from tests.conftest import auth
+
+
+def test_cursor_round_trip_keeps_value_type():
+    when = datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc)
+    cursor = server.encode_cursor({"created_at": when, "id": "abc"}, "created_at")
+    assert server.decode_cursor(cursor) == (when, "abc")
+
+    cursor = server.encode_cursor({"created_at": "2025-03-01T12:30:00", "id": "abc"}, "created_at")
+    assert server.decode_cursor(cursor) == ("2025-03-01T12:30:00", "abc")
+
+
+def test_garbage_cursor_is_a_400():
+    with pytest.raises(HTTPException) as exc:
+        server.decode_cursor("not-a-cursor")
+    assert exc.value.status_code == 400
+
+
+def test_walking_cursor_visits_every_row_once(client, db):
+    # Groups of rows share a created_at, so the id tiebreak has to carry the page
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    docs = [
+        {
+            "id": f"devotion-{i:03d}",
+            "title": f"Devotion {i}",
+            "content": "Text",
+            "date": "2025-01-01",
+            "author_id": "admin",
+            "created_at": base + timedelta(hours=i // 3)
+        }
+        for i in range(25)
+    ]
+    client.portal.call(db.devotions.insert_many, docs)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/devotions", params=params, headers=auth("resident"))
+        assert response.status_code == 200
+        seen.extend(item["id"] for item in response.json())
+        cursor = response.headers.get(server.NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+
+    expected = [doc["id"] for doc in sorted(docs, key=lambda d: (d["created_at"], d["id"]), reverse=True)]
+    assert seen == expected
+
+
+def test_exactly_one_full_page_has_no_cursor(client, db):
+    docs = [
+        {"id": f"devotion-{i}", "title": "T", "content": "C", "date": "2025-01-01", "author_id": "admin",
+         "created_at": datetime(2025, 1, 1 + i, tzinfo=timezone.utc)}
+        for i in range(4)
+    ]
+    client.portal.call(db.devotions.insert_many, docs)
+    response = client.get("/api/devotions", params={"limit": 4}, headers=auth("resident"))
+    assert len(response.json()) == 4
+    assert server.NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_resident_stats_page_on_user_id(client, db):
+    client.portal.call(db.resident_stats.insert_many, [{"user_id": f"resident-{i:02d}"} for i in range(7)])
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/resident-stats", params=params, headers=auth("mentor"))
+        assert response.status_code == 200
+        seen.extend(entry["user_id"] for entry in response.json())
+        cursor = response.headers.get(server.NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+
+    assert seen == [f"resident-{i:02d}" for i in range(7)]
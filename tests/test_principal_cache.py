@@ -0,0 +1,27 @@
+import time
+
+import server
+from tests.conftest import auth
+
+
+def test_default_ttl_is_a_few_seconds():
+    assert server.PrincipalCache().ttl_seconds <= 5
+
+
+def test_logout_on_another_worker_lands_within_the_ttl(client, db, monkeypatch):
+    monkeypatch.setattr(server, "principal_cache", server.PrincipalCache(ttl_seconds=0.2))
+    assert client.get("/api/auth/me", headers=auth("resident")).status_code == 200
+
+    # Another worker logs the session out: the shared store forgets it but
+    # this worker's cache does not hear about it
+    client.portal.call(db.user_sessions.delete_one, {"session_token": "token-resident"})
+    assert client.get("/api/auth/me", headers=auth("resident")).status_code == 200
+
+    time.sleep(0.25)
+    assert client.get("/api/auth/me", headers=auth("resident")).status_code == 401
+
+
+def test_logout_on_this_worker_is_immediate(client):
+    assert client.get("/api/auth/me", headers=auth("resident")).status_code == 200
+    assert client.post("/api/auth/logout", headers=auth("resident")).status_code == 200
+    assert client.get("/api/auth/me", headers=auth("resident")).status_code == 401
@@ -0,0 +1,170 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException, Response
+
+import server
+from tests.conftest import auth
+from tests.test_conditional_get import request
+
+
+def create_series(client, **fields) -> dict:
+    payload = {"title": "House meeting", "event_date": "2025-01-06T18:00:00+00:00", "event_type": "meeting", **fields}
+    response = client.post("/api/calendar-events", json=payload, headers=auth("mentor"))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def month(client, year: int, month: int) -> list:
+    response = client.get(f"/api/calendar-events/month/{year}/{month}", headers=auth("resident"))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.mark.parametrize("rule", [
+    "DTSTART:20250106T180000Z\nRRULE:FREQ=WEEKLY",
+    "RRULE:FREQ=WEEKLY\nEXDATE:20250113T180000",
+    "FREQ=WEEKLY;EXDATE=20250113T180000",
+    "FREQ=MINUTELY",
+    "FREQ=DAILY;BYSECOND=1,2,3",
+    "FREQ=WEEKLY;FREQ=DAILY",
+    "INTERVAL=2",
+    "FREQ=DAILY;INTERVAL=0",
+    "FREQ=DAILY;COUNT=-1",
+    "FREQ=DAILY;BYMONTH=2;BYMONTHDAY=30",
+    "FREQ=MONTHLY;BYDAY=MO;BYSETPOS=6",
+    "FREQ=WEEKLY;UNTIL=20240101T000000",
+])
+def test_rejects_rules_outside_the_single_rrule_whitelist(client, rule):
+    response = client.post("/api/calendar-events", json={
+        "title": "Bad", "event_date": "2025-01-06T18:00:00+00:00", "event_type": "meeting", "rrule": rule
+    }, headers=auth("mentor"))
+    assert response.status_code == 400
+
+
+def test_rule_is_validated_by_expanding_it():
+    data = server.CalendarEventCreate(title="t", event_date="2025-01-06T18:00:00", event_type="meeting",
+                                      rrule="FREQ=WEEKLY;UNTIL=20250301T000000Z")
+    with pytest.raises(HTTPException) as error:
+        server.build_rrule(data, datetime(2025, 1, 6, 18))
+    assert error.value.status_code == 400
+
+
+def test_weekly_series_expands_with_exdates_and_overrides(client, db):
+    series = create_series(client, rrule="RRULE:FREQ=WEEKLY;COUNT=4")
+    assert series["rrule"] == "FREQ=WEEKLY;COUNT=4"
+
+    path = f"/api/calendar-events/{series['id']}/occurrences"
+    # Fractional seconds on the way in still land on the occurrence's key
+    cancelled = client.patch(path, json={"occurrence_date": "2025-01-13T18:00:00.250000+00:00", "cancelled": True},
+                             headers=auth("mentor"))
+    assert cancelled.status_code == 200
+    edited = client.patch(path, json={"occurrence_date": "2025-01-20T18:00:00Z", "location": "Chapel"},
+                          headers=auth("mentor"))
+    assert edited.status_code == 200
+
+    stored = client.portal.call(db.calendar_events.find_one, {"id": series["id"]})
+    assert stored["exdates"] == ["20250113T180000"]
+    assert stored["overrides"] == {"20250120T180000": {"location": "Chapel"}}
+
+    events = month(client, 2025, 1)
+    assert [e["event_date"][:10] for e in events] == ["2025-01-06", "2025-01-20", "2025-01-27"]
+    assert [e["location"] for e in events] == [None, "Chapel", None]
+    assert all(e["series_id"] == series["id"] for e in events)
+
+
+def test_legacy_iso_keys_still_apply():
+    master = {
+        "id": "series", "title": "t", "event_date": datetime(2025, 1, 6, 18), "rrule": "FREQ=WEEKLY;COUNT=3",
+        "exdates": ["2025-01-13T18:00:00"], "overrides": {"2025-01-20T18:00:00": {"title": "moved"}}
+    }
+    occurrences = server.expand_series(master, datetime(2025, 1, 1), datetime(2025, 2, 1), 10)
+    assert [o["event_date"].day for o in occurrences] == [6, 20]
+    assert occurrences[1]["title"] == "moved"
+
+
+def test_expansion_stops_at_the_limit_or_window_end():
+    master = {"id": "daily", "title": "t", "event_date": datetime(2000, 1, 1), "rrule": "FREQ=DAILY",
+              "exdates": ["20000102T000000"]}
+    occurrences = server.expand_series(master, datetime(2000, 1, 1), datetime(2100, 1, 1), 5)
+    # Cancelled occurrences do not count towards the limit
+    assert [o["event_date"].day for o in occurrences] == [1, 3, 4, 5, 6]
+    assert len(server.expand_series(master, datetime(2000, 1, 1), datetime(2000, 1, 4), 5)) == 2
+
+
+def test_paging_walks_every_occurrence_of_a_long_series(client):
+    create_series(client, event_date="2024-01-01T09:00:00+00:00", rrule="FREQ=DAILY;UNTIL=20261231T090000")
+    params = {"start": "2024-01-01T00:00:00Z", "end": "2027-01-01T00:00:00Z", "limit": 500}
+    dates, pages = [], 0
+    while True:
+        response = client.get("/api/calendar-events", params=params, headers=auth("resident"))
+        dates += [e["event_date"][:10] for e in response.json()]
+        pages += 1
+        if "x-next-cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["x-next-cursor"]
+    assert pages == 3
+    assert len(dates) == len(set(dates)) == 366 + 365 + 365
+    assert dates[0] == "2024-01-01" and dates[-1] == "2026-12-31"
+
+
+def test_rule_that_never_matches_is_rejected_quickly(client):
+    began = time.monotonic()
+    response = client.post("/api/calendar-events", json={
+        "title": "Never", "event_date": "2025-01-06T18:00:00+00:00", "event_type": "meeting",
+        "rrule": "FREQ=DAILY;BYMONTH=2;BYMONTHDAY=30"
+    }, headers=auth("mentor"))
+    assert response.status_code == 400
+    assert time.monotonic() - began < 2
+
+
+def test_unexpandable_stored_series_is_skipped(client, db):
+    create_series(client, rrule="FREQ=WEEKLY;COUNT=2")
+    client.portal.call(db.calendar_events.insert_one, {
+        "id": "legacy", "title": "Old", "event_date": datetime(2025, 1, 1), "event_type": "meeting",
+        "rrule": "FREQ=WEEKLY;UNTIL=20250301T000000Z", "created_by": "mentor"
+    })
+    client.portal.call(db.calendar_events.insert_one, {
+        "id": "never", "title": "Never", "event_date": datetime(2025, 1, 1), "event_type": "meeting",
+        "rrule": "FREQ=DAILY;BYMONTH=2;BYMONTHDAY=30", "created_by": "mentor"
+    })
+    assert len(month(client, 2025, 1)) == 2
+
+
+def test_etag_covers_the_resolved_window():
+    version = {"version": 1}
+    first, second = Response(), Response()
+    server.not_modified(request({}), first, "calendar_events", version, "20250101T000000/20260101T000000")
+    server.not_modified(request({}), second, "calendar_events", version, "20250102T000000/20260102T000000")
+    assert first.headers["etag"] != second.headers["etag"]
+
+
+@pytest.mark.parametrize("path", ["2025/13", "2025/0", "0/1", "10000/1", "9999/12"])
+def test_month_out_of_range_is_rejected(client, path):
+    response = client.get(f"/api/calendar-events/month/{path}", headers=auth("resident"))
+    assert response.status_code == 422
+
+
+def test_window_defaults_are_symmetric(client):
+    create_series(client, rrule="FREQ=WEEKLY;COUNT=52")
+
+    # Only an end: the span reaches back from it, as it reaches forward from
+    # a start given alone
+    before = client.get("/api/calendar-events", params={"end": "2025-02-01T00:00:00Z"}, headers=auth("resident"))
+    assert [e["event_date"][:10] for e in before.json()] == ["2025-01-06", "2025-01-13", "2025-01-20", "2025-01-27"]
+    after = client.get("/api/calendar-events", params={"start": "2025-12-01T00:00:00Z"}, headers=auth("resident"))
+    assert [e["event_date"][:10] for e in after.json()] == ["2025-12-01", "2025-12-08", "2025-12-15", "2025-12-22", "2025-12-29"]
+
+
+def test_default_window_applies_to_one_off_events(client, db):
+    now = datetime.now(timezone.utc)
+    client.portal.call(db.calendar_events.insert_many, [
+        {"id": "ancient", "title": "Old", "event_date": datetime(2015, 6, 1), "event_type": "outing",
+         "rrule": None, "created_by": "mentor"},
+        {"id": "soon", "title": "Soon", "event_date": now + timedelta(days=3), "event_type": "outing",
+         "rrule": None, "created_by": "mentor"},
+    ])
+    for params in ({}, {"end": (now + timedelta(days=30)).isoformat()}):
+        response = client.get("/api/calendar-events", params=params, headers=auth("resident"))
+        assert [e["id"] for e in response.json()] == ["soon"]
@@ -0,0 +1,47 @@
+import asyncio
+
+import server
+
+
+def test_results_are_copies():
+    async def scenario():
+        cache = server.ReadThroughCache()
+
+        async def load():
+            return [{"title": "Psalm 23"}]
+        first = await cache.get(("devotions", 1), load)
+        first[0]["title"] = "edited in a handler"
+        first.append({"title": "extra"})
+        return await cache.get(("devotions", 1), load)
+
+    assert asyncio.run(scenario()) == [{"title": "Psalm 23"}]
+
+
+def test_invalidation_only_discards_loads_in_its_namespace():
+    async def scenario():
+        cache = server.ReadThroughCache()
+        release = asyncio.Event()
+        loads = []
+
+        def slow_loader(value):
+            async def load():
+                loads.append(value)
+                await release.wait()
+                return value
+            return load
+
+        devotions = asyncio.ensure_future(cache.get(("devotions", 1), slow_loader("devotions")))
+        materials = asyncio.ensure_future(cache.get(("reading_materials", 1), slow_loader("materials")))
+        while len(loads) < 2:
+            await asyncio.sleep(0)
+        # A write lands while both loads are in flight
+        cache.invalidate("reading_materials")
+        release.set()
+        await asyncio.gather(devotions, materials)
+
+        await cache.get(("devotions", 1), slow_loader("devotions again"))
+        await cache.get(("reading_materials", 1), slow_loader("materials again"))
+        return loads
+
+    # The devotions load was kept; the materials load may have read old data
+    assert asyncio.run(scenario()) == ["devotions", "materials", "materials again"]
@@ -0,0 +1,115 @@
+from datetime import datetime, timezone
+
+from tests.conftest import auth
+
+STAT_FIELDS = ["drug_tests_total", "negative_test_streak", "last_test_date", "last_positive_date",
+               "meetings_total", "meetings_attended", "rent_payments_total", "rent_paid_total"]
+
+
+def drug_test(test_date: str, result: str = "negative", user_id: str = "resident") -> dict:
+    return {"user_id": user_id, "test_date": test_date, "test_type": "urine", "result": result,
+            "administered_by": "mentor"}
+
+
+def stats(client, user_id: str = "resident") -> dict:
+    response = client.get(f"/api/resident-stats/{user_id}", headers=auth("admin"))
+    assert response.status_code == 200
+    return {field: response.json()[field] for field in STAT_FIELDS}
+
+
+def rebuilt(client, user_id: str = "resident") -> dict:
+    response = client.post("/api/admin/resident-stats/rebuild", params={"user_id": user_id}, headers=auth("admin"))
+    assert response.status_code == 200
+    return stats(client, user_id)
+
+
+def test_batch_with_a_backdated_item_is_counted_once(client):
+    assert client.post("/api/drug-tests", json=drug_test("2025-02-01T09:00:00+00:00"), headers=auth("mentor")).status_code == 200
+    response = client.post("/api/drug-tests/batch", json=[
+        drug_test("2025-04-01T09:00:00+00:00"),
+        drug_test("2025-01-01T09:00:00+00:00"),
+    ], headers=auth("mentor"))
+    assert response.json()["created"] == 2
+
+    incremental = stats(client)
+    assert incremental["drug_tests_total"] == 3
+    assert incremental["negative_test_streak"] == 3
+    assert incremental == rebuilt(client)
+
+
+def post_test(client, test_date: str, result: str = "negative"):
+    response = client.post("/api/drug-tests", json=drug_test(test_date, result), headers=auth("mentor"))
+    assert response.status_code == 200
+
+
+def test_in_order_tests_extend_the_streak(client):
+    for day in ("2025-01-01", "2025-01-08", "2025-01-15"):
+        post_test(client, f"{day}T09:00:00+00:00")
+    incremental = stats(client)
+    assert incremental["drug_tests_total"] == 3
+    assert incremental["negative_test_streak"] == 3
+    assert incremental["last_test_date"].startswith("2025-01-15")
+    assert incremental == rebuilt(client)
+
+
+def test_positive_result_resets_the_streak(client):
+    post_test(client, "2025-01-01T09:00:00+00:00")
+    post_test(client, "2025-01-08T09:00:00+00:00", "positive")
+    post_test(client, "2025-01-15T09:00:00+00:00")
+    incremental = stats(client)
+    assert incremental["negative_test_streak"] == 1
+    assert incremental["last_positive_date"].startswith("2025-01-08")
+    assert incremental == rebuilt(client)
+
+
+def test_backdated_test_is_recounted(client):
+    post_test(client, "2025-01-01T09:00:00+00:00")
+    post_test(client, "2025-01-15T09:00:00+00:00")
+    # A positive result entered late lands between the two negatives
+    post_test(client, "2025-01-08T09:00:00+00:00", "positive")
+    incremental = stats(client)
+    assert incremental["drug_tests_total"] == 3
+    assert incremental["negative_test_streak"] == 1
+    assert incremental["last_test_date"].startswith("2025-01-15")
+    assert incremental["last_positive_date"].startswith("2025-01-08")
+    assert incremental == rebuilt(client)
+
+
+def test_meetings_and_confirmed_rent_match_a_rebuild(client, db):
+    mentor = auth("mentor")
+    for attended in (True, False, True):
+        assert client.post("/api/meetings", json={
+            "user_id": "resident", "meeting_date": "2025-01-05T19:00:00+00:00", "meeting_type": "house",
+            "attended": attended, "recorded_by": "mentor"
+        }, headers=mentor).status_code == 200
+    payments = [client.post("/api/rent-payments", json={
+        "user_id": "resident", "payment_date": payment_date, "amount": amount
+    }, headers=mentor).json() for payment_date, amount in (("2025-01-03T12:00:00+00:00", 100.0),
+                                                           ("2025-02-03T12:00:00+00:00", 75.0))]
+    for payment in payments:
+        assert client.patch(f"/api/rent-payments/{payment['id']}/confirm",
+                            json={"confirmed": True, "confirmed_by": "admin"}, headers=auth("admin")).status_code == 200
+    # Unconfirming takes the amount back out of its month
+    assert client.patch(f"/api/rent-payments/{payments[1]['id']}/confirm",
+                        json={"confirmed": False, "confirmed_by": "admin"}, headers=auth("admin")).status_code == 200
+
+    def by_month() -> dict:
+        doc = client.portal.call(db.resident_stats.find_one, {"user_id": "resident"})
+        return {month: paid for month, paid in doc["rent_paid_by_month"].items() if paid}
+
+    incremental, incremental_months = stats(client), by_month()
+    assert incremental["meetings_total"] == 3 and incremental["meetings_attended"] == 2
+    assert incremental["rent_payments_total"] == 2 and incremental["rent_paid_total"] == 100.0
+    assert incremental_months == {"2025-01": 100.0}
+    assert incremental == rebuilt(client)
+    assert by_month() == incremental_months
+
+
+def test_rent_confirmed_this_month_is_reported(client):
+    payment = client.post("/api/rent-payments", json={
+        "user_id": "resident", "payment_date": datetime.now(timezone.utc).isoformat(), "amount": 60.0
+    }, headers=auth("mentor")).json()
+    assert client.patch(f"/api/rent-payments/{payment['id']}/confirm",
+                        json={"confirmed": True, "confirmed_by": "admin"}, headers=auth("admin")).status_code == 200
+    response = client.get("/api/resident-stats/resident", headers=auth("admin"))
+    assert response.json()["rent_paid_this_month"] == 60.0
@@ -0,0 +1,157 @@
+import asyncio
+import socket
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import redis_stub
+import server
+from tests.conftest import auth
+
+
+def later(**delta) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(**delta)
+
+
+async def round_trip(store):
+    await store.create("token-a", "resident", later(days=1))
+    session = await store.get("token-a")
+    assert session["user_id"] == "resident"
+    assert server.as_utc(session["expires_at"]) > datetime.now(timezone.utc)
+    await store.delete("token-a")
+    assert await store.get("token-a") is None
+    # Deleting a session that is already gone is not an error
+    await store.delete("token-a")
+
+
+async def serve_stub(closed: list = None, clients: list = None):
+    async def serve_client(reader, writer):
+        if clients is not None:
+            clients.append(writer)
+        await redis_stub.serve_client(reader, writer)
+        if closed is not None:
+            closed.append(writer)
+    server_ = await asyncio.start_server(serve_client, "127.0.0.1", 0)
+    return server_, server_.sockets[0].getsockname()[1]
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_memory_store_round_trip_and_sweep():
+    async def scenario():
+        store = server.MemorySessionStore()
+        await round_trip(store)
+        await store.create("expired", "resident", later(seconds=-1))
+        await store.create("live", "resident", later(days=1))
+        assert await store.sweep() == 1
+        assert await store.get("expired") is None
+        assert await store.get("live") is not None
+
+    asyncio.run(scenario())
+
+
+def test_redis_store_round_trip_and_expiry():
+    async def scenario():
+        stub, port = await serve_stub()
+        store = server.RedisSessionStore(f"redis://127.0.0.1:{port}/2")
+        try:
+            await round_trip(store)
+            await store.create("short", "resident", later(milliseconds=50))
+            assert await store.get("short") is not None
+            await asyncio.sleep(0.1)
+            assert await store.get("short") is None
+            # Already expired: never written
+            await store.create("stale", "resident", later(seconds=-1))
+            assert await store.get("stale") is None
+        finally:
+            await store.stop()
+            stub.close()
+
+    asyncio.run(scenario())
+
+
+def test_redis_handshake_failure_closes_the_socket(monkeypatch):
+    monkeypatch.setattr(redis_stub, "password", "secret")
+
+    async def scenario():
+        closed = []
+        stub, port = await serve_stub(closed)
+        store = server.RedisSessionStore(f"redis://:wrong@127.0.0.1:{port}/0")
+        try:
+            with pytest.raises(server.SessionStoreError):
+                await store.get("token-a")
+            # The stub only finishes a client once the store hangs up
+            for _ in range(100):
+                if closed:
+                    break
+                await asyncio.sleep(0.01)
+            assert closed and store._idle == []
+        finally:
+            stub.close()
+
+    asyncio.run(scenario())
+
+
+def test_dropped_pooled_connection_is_retried_once():
+    async def scenario():
+        clients = []
+        stub, port = await serve_stub(clients=clients)
+        store = server.RedisSessionStore(f"redis://127.0.0.1:{port}/0")
+        try:
+            await store.create("token-a", "resident", later(days=1))
+            assert len(store._idle) == 1
+            # Redis restarts or times the idle connection out
+            for writer in clients:
+                writer.close()
+            await asyncio.sleep(0.05)
+            assert (await store.get("token-a"))["user_id"] == "resident"
+            assert len(clients) == 2
+
+            # An error reply is Redis answering, not a dead socket
+            with pytest.raises(server.SessionStoreError):
+                await store.execute("BOGUS")
+            assert len(clients) == 2
+        finally:
+            await store.stop()
+            stub.close()
+
+    asyncio.run(scenario())
+
+
+def test_unreachable_redis_raises_store_error():
+    async def scenario():
+        store = server.RedisSessionStore(f"redis://127.0.0.1:{unused_port()}/0", timeout=0.5)
+        with pytest.raises(server.SessionStoreError):
+            await store.get("token-a")
+
+    asyncio.run(scenario())
+
+
+def test_store_outage_is_503_not_500(client, monkeypatch):
+    store = server.RedisSessionStore(f"redis://127.0.0.1:{unused_port()}/0", timeout=0.5)
+    monkeypatch.setattr(server, "session_store", store)
+    response = client.get("/api/auth/me", headers=auth("resident"))
+    assert response.status_code == 503
+
+
+def test_mongo_sweep_removes_expired_sessions_in_batches(db):
+    now = datetime.now(timezone.utc)
+
+    async def scenario():
+        store = server.MongoSessionStore(batch_size=1)
+        await round_trip(store)
+        await db.user_sessions.insert_many([
+            {"session_token": "old", "user_id": "resident", "expires_at": now - timedelta(hours=1)},
+            # Written before expiries were stored as dates
+            {"session_token": "old-iso", "user_id": "resident", "expires_at": (now - timedelta(hours=1)).isoformat()},
+            {"session_token": "live", "user_id": "resident", "expires_at": now + timedelta(hours=1)},
+        ])
+        removed = await store.sweep()
+        remaining = await db.user_sessions.distinct("session_token")
+        return removed, remaining, store.swept
+
+    assert asyncio.run(scenario()) == (2, ["live"], 2)
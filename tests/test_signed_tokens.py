@@ -0,0 +1,84 @@
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+from tests.conftest import auth
+
+RESIDENT = {"id": "resident", "email": "resident@example.com", "name": "Resident", "picture": "", "role": "user"}
+
+
+@pytest.fixture
+def signing(db, monkeypatch):
+    monkeypatch.setattr(server, "SESSION_SIGNING_KEY", b"test-signing-key")
+    monkeypatch.setattr(server, "session_revocations", server.SessionRevocations())
+
+
+def issue(**delta) -> str:
+    return server.issue_signed_token(RESIDENT, datetime.now(timezone.utc) + timedelta(**(delta or {"days": 1})))
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def me(client, token: str) -> int:
+    return client.get("/api/auth/me", headers=bearer(token)).status_code
+
+
+def test_valid_token_is_accepted(client, signing):
+    response = client.get("/api/auth/me", headers=bearer(issue()))
+    assert response.status_code == 200
+    assert response.json()["id"] == "resident"
+
+
+def test_tampered_token_is_rejected(client, signing):
+    token = issue()
+    payload, signature = token[len(server.SIGNED_TOKEN_PREFIX):].split(".")
+    # Same claims, but promoted to admin without re-signing
+    claims = json.loads(server._b64decode(payload))
+    forged = server._b64encode(json.dumps({**claims, "role": "admin"}).encode())
+    assert me(client, f"{server.SIGNED_TOKEN_PREFIX}{forged}.{signature}") == 401
+
+    flipped = ("A" if signature[0] != "A" else "B") + signature[1:]
+    assert me(client, f"{server.SIGNED_TOKEN_PREFIX}{payload}.{flipped}") == 401
+    assert me(client, f"{server.SIGNED_TOKEN_PREFIX}{payload}") == 401
+
+
+def test_token_signed_with_another_key_is_rejected(client, signing, monkeypatch):
+    monkeypatch.setattr(server, "SESSION_SIGNING_KEY", b"another-key")
+    token = issue()
+    monkeypatch.setattr(server, "SESSION_SIGNING_KEY", b"test-signing-key")
+    assert me(client, token) == 401
+
+
+def test_expired_token_is_rejected(client, signing):
+    assert server.decode_signed_token(issue(seconds=-1)) is None
+    assert me(client, issue(seconds=-1)) == 401
+
+
+def test_logged_out_token_is_rejected(client, signing):
+    token, other = issue(), issue()
+    assert client.post("/api/auth/logout", headers=bearer(token)).status_code == 200
+    assert me(client, token) == 401
+    # Only the token that logged out is revoked
+    assert me(client, other) == 200
+
+
+def test_role_change_revokes_the_users_tokens(client, db, signing):
+    token = issue()
+    assert me(client, token) == 200
+    response = client.patch("/api/users/resident/role", params={"role": "mentor"}, headers=auth("admin"))
+    assert response.status_code == 200
+    assert me(client, token) == 401
+
+    # Another worker picks the revocation up from Mongo on its next refresh
+    other_worker = server.SessionRevocations(refresh_seconds=0)
+    claims = server.decode_signed_token(token)
+    assert client.portal.call(other_worker.is_revoked, claims)
+
+    # Tokens issued after the change are accepted
+    time.sleep(0.01)
+    assert me(client, issue()) == 200
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+from PIL import Image
+
+import server
+from tests.conftest import auth
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 4), "teal").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def upload(client, name: str, content: bytes, content_type: str):
+    return client.post(
+        "/api/upload",
+        files={"file": (name, content, content_type)},
+        headers=auth("resident")
+    )
+
+
+def test_extension_comes_from_the_validated_type(client):
+    response = upload(client, "evil.html", png_bytes(), "image/png")
+    assert response.status_code == 200
+    url = response.json()["url"]
+    assert url.endswith(".png")
+
+    served = client.get(url)
+    assert served.headers["content-type"] == "image/png"
+    assert served.headers["x-content-type-options"] == "nosniff"
+
+
+def test_content_must_match_declared_type(client):
+    response = upload(client, "evil.html", b"<script>alert(1)</script>", "image/png")
+    assert response.status_code == 415
+
+
+def test_unlisted_type_is_rejected(client):
+    response = upload(client, "page.html", b"<html></html>", "text/html")
+    assert response.status_code == 415
+
+
+def test_empty_file_is_rejected(client):
+    response = upload(client, "empty.pdf", b"", "application/pdf")
+    assert response.status_code == 400
+
+
+def test_oversized_file_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(server, "UPLOAD_MAX_BYTES", 64)
+    response = upload(client, "big.pdf", b"%PDF-" + b"x" * 1024, "application/pdf")
+    assert response.status_code == 413
+
+
+def test_oversized_chunked_body_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(server, "UPLOAD_MAX_BYTES", 64)
+    monkeypatch.setattr(server, "UPLOAD_MULTIPART_OVERHEAD", 0)
+
+    def body():
+        for _ in range(8):
+            yield b"x" * 1024
+
+    response = client.post(
+        "/api/upload",
+        content=body(),
+        headers={"Content-Type": "multipart/form-data; boundary=b", **auth("resident")}
+    )
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize("content_length, status", [(b"abc", 400), (b"999999999999", 413)])
+def test_content_length_checked_before_the_body(content_length, status):
+    sent = []
+
+    async def app(scope, receive, send):
+        raise AssertionError("request should not reach the app")
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = server.UploadSizeLimitMiddleware(app)
+    scope = {"type": "http", "path": "/api/upload", "headers": [(b"content-length", content_length)]}
+    asyncio.run(middleware(scope, receive, send))
+    assert sent[0]["status"] == status
+
+
+def image_with_metadata(fmt: str) -> bytes:
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x010F] = "CameraMaker"
+    exif.get_ifd(0x8825)[1] = "N"
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 4), "teal").save(buffer, fmt, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def stored_bytes(url: str) -> bytes:
+    return (server.UPLOAD_DIR / url.removeprefix("/uploads/")).read_bytes()
+
+
+def test_jpeg_original_keeps_only_orientation(client):
+    response = upload(client, "photo.jpg", image_with_metadata("JPEG"), "image/jpeg")
+    assert response.status_code == 200
+    stored = stored_bytes(response.json()["url"])
+    assert b"CameraMaker" not in stored
+
+    with Image.open(io.BytesIO(stored)) as image:
+        exif = image.getexif()
+        assert exif.get(0x0112) == 6
+        assert not exif.get_ifd(0x8825)
+        assert image.size == (8, 4)
+
+
+@pytest.mark.parametrize("fmt, content_type", [("PNG", "image/png"), ("WEBP", "image/webp")])
+def test_png_and_webp_originals_lose_exif(client, fmt, content_type):
+    original = image_with_metadata(fmt)
+    assert b"CameraMaker" in original
+
+    response = upload(client, "photo", original, content_type)
+    assert response.status_code == 200
+    stored = stored_bytes(response.json()["url"])
+    assert b"CameraMaker" not in stored
+    with Image.open(io.BytesIO(stored)) as image:
+        image.load()
+        assert image.size == (8, 4)
+
+
+@pytest.mark.parametrize("content", [
+    b"\xff\xd8\xff",
+    b"\xff\xd8\xff\xe0\x00",
+    b"\xff\xd8\xff\xe1\x00\x10Exif\x00\x00MM\x00*garbage",
+])
+def test_truncated_jpeg_is_unsupported_media(client, content):
+    assert upload(client, "photo.jpg", content, "image/jpeg").status_code == 415
+
+
+@pytest.mark.parametrize("fmt, content_type", [("JPEG", "image/jpeg"), ("PNG", "image/png"), ("WEBP", "image/webp")])
+def test_strippers_reject_every_truncation_with_value_error(fmt, content_type):
+    original = image_with_metadata(fmt)
+    strip = server.METADATA_STRIPPERS[content_type]
+    for end in range(len(original)):
+        try:
+            strip(original[:end])
+        except ValueError:
+            pass
+
+
+def test_url_hash_is_of_the_stripped_bytes(client):
+    response = upload(client, "photo.jpg", image_with_metadata("JPEG"), "image/jpeg")
+    url = response.json()["url"]
+    assert hashlib.sha256(stored_bytes(url)).hexdigest() in url
+
+
+def test_identical_content_is_stored_once(client, db):
+    first = upload(client, "a.pdf", b"%PDF-1.4 same", "application/pdf").json()["url"]
+    second = upload(client, "b.pdf", b"%PDF-1.4 same", "application/pdf").json()["url"]
+    assert first == second
+    entries = client.portal.call(db.uploads.find({}, {"_id": 0}).to_list, 10)
+    assert len(entries) == 1
+    assert "ref_count" not in entries[0]
+
+
+def test_partial_files_stay_outside_the_served_tree(client, monkeypatch):
+    assert server.UPLOAD_DIR not in server.UPLOAD_TMP_DIR.parents
+    monkeypatch.setattr(server, "UPLOAD_MAX_BYTES", 64)
+    upload(client, "big.pdf", b"%PDF-" + b"x" * 1024, "application/pdf")
+    assert not list(server.UPLOAD_DIR.rglob("*.part"))
+    assert not list(server.UPLOAD_TMP_DIR.iterdir())